@@ -0,0 +1,214 @@
+# admission.py - Admission control in front of the model quota
+#
+# A global token bucket (MODEL_QUOTA_RPM, MODEL_QUOTA_BURST) paces model calls
+# to the provider's quota. Calls beyond it wait in a bounded FIFO queue, for
+# at most ADMISSION_MAX_WAIT_SECONDS; anything more is shed at once with a
+# Retry-After. Per-client token buckets (CLIENT_RATE_LIMIT_RPM) answer 429
+# before a request does any work.
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class AdmissionError(Exception):
+    """A request turned away by admission control, with when to try again"""
+
+    status_code = 503
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class OverloadedError(AdmissionError):
+    """The model quota queue is full or would take too long"""
+
+
+class RateLimitedError(AdmissionError):
+    """One client is sending more than its share"""
+
+    status_code = 429
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second up to `burst`. The balance may go negative:
+    each negative token is a reservation for a waiting caller, so waits are
+    first come, first served.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def reserve(self) -> float:
+        """Take a token now or in the future; seconds until it is available"""
+        self._refill()
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self) -> None:
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def wait_time(self) -> float:
+        """Seconds until a token would be available to a new caller"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class ModelQuota:
+    """Global pacing of model calls with a bounded, time-limited wait queue"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None,
+                 max_waiting: int = 100, max_wait_seconds: float = 5):
+        self.rate_per_minute = rate_per_minute
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        self.bucket = TokenBucket(rate_per_minute / 60, burst or max(1.0, rate_per_minute / 60))
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is free right now (e.g. for an optional hedge)"""
+        return not self.enabled or (self.waiting == 0 and self.bucket.try_take())
+
+    async def acquire(self) -> None:
+        """Wait for a model call slot, or raise OverloadedError without waiting"""
+        if not self.enabled:
+            return
+        if self.waiting == 0 and self.bucket.try_take():
+            self.admitted += 1
+            return
+        delay = self.bucket.wait_time()
+        # Once shed, a retry is worth it when the queue is short enough again
+        retry_after = max(delay - self.max_wait_seconds, 1 / self.bucket.rate)
+        if self.waiting >= self.max_waiting:
+            self.shed += 1
+            raise OverloadedError("Too many practices are waiting for the model right now. Please try again shortly.",
+                                  retry_after=retry_after)
+        if delay > self.max_wait_seconds:
+            self.shed += 1
+            raise OverloadedError("The model is at capacity right now. Please try again shortly.",
+                                  retry_after=retry_after)
+
+        delay = self.bucket.reserve()
+        self.waiting += 1
+        self.queued += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # The caller left; give its slot to whoever comes next
+            self.bucket.refund()
+            raise
+        finally:
+            self.waiting -= 1
+        self.admitted += 1
+
+    def exhausted(self) -> None:
+        """The provider refused a call for quota: spend the burst so calls are paced from now on"""
+        if self.enabled:
+            self.bucket.tokens = min(self.bucket.tokens, 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_minute": self.rate_per_minute or None,
+            "wait_seconds": round(self.bucket.wait_time(), 2) if self.enabled else None,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "max_wait_seconds": self.max_wait_seconds,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed
+        }
+
+
+class ClientRateLimiter:
+    """A token bucket per client, for the most recently seen max_clients clients"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None, max_clients: int = 10000):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst or max(1.0, rate_per_minute / 60)
+        self.max_clients = max_clients
+        self.limited = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client: str) -> None:
+        """Count one request from client, raising RateLimitedError beyond its rate"""
+        if self.rate_per_minute <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate_per_minute / 60, self.burst)
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(client)
+            if bucket.try_take():
+                return
+            self.limited += 1
+            raise RateLimitedError("You are requesting practices faster than we can prepare them. Please slow down.",
+                                   retry_after=bucket.wait_time())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_minute": self.rate_per_minute or None,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "limited": self.limited
+        }
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """Whether a model error is the provider refusing for quota (HTTP 429, RESOURCE_EXHAUSTED)"""
+    return type(error).__name__ in ('ResourceExhausted', 'TooManyRequests') or getattr(error, 'code', None) == 429
+
+
+def worker_share(total: float) -> float:
+    """A per-process share of a limit meant for the whole server (see serve.py)"""
+    return total / max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+
+
+def create_model_quota() -> ModelQuota:
+    """Build the quota configured by MODEL_QUOTA_* and ADMISSION_*; MODEL_QUOTA_RPM=0 disables it"""
+    burst = os.getenv('MODEL_QUOTA_BURST')
+    return ModelQuota(
+        worker_share(float(os.getenv('MODEL_QUOTA_RPM', '0'))),
+        burst=max(1.0, worker_share(float(burst))) if burst else None,
+        max_waiting=int(os.getenv('ADMISSION_QUEUE_SIZE', '100')),
+        max_wait_seconds=float(os.getenv('ADMISSION_MAX_WAIT_SECONDS', '5'))
+    )
+
+
+def create_client_limiter() -> ClientRateLimiter:
+    """Build the limiter configured by CLIENT_RATE_LIMIT_RPM and CLIENT_BURST; 0 disables it"""
+    burst = os.getenv('CLIENT_BURST')
+    return ClientRateLimiter(
+        float(os.getenv('CLIENT_RATE_LIMIT_RPM', '0')),
+        burst=float(burst) if burst else None
+    )
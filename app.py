@@ -1,8 +1,14 @@
 # app.py - Streamlit Frontend
 import streamlit as st
+import streamlit.components.v1 as components
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from typing import Dict
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 
 # Configure page
 st.set_page_config(
@@ -12,282 +18,59 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Custom CSS for Buddhist aesthetic
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Crimson+Text:ital,wght@0,400;0,600;1,400&display=swap');
-    
-    /* Main styling */
-    .main {
-        background: linear-gradient(135deg, #f5f3f0 0%, #e8e4df 100%);
-        font-family: 'Crimson Text', serif;
-    }
-    
-    /* Header styling */
-    .header-container {
-        text-align: center;
-        padding: 2rem 0;
-        margin-bottom: 2rem;
-    }
-    
-    .lotus-symbol {
-        font-size: 4rem;
-        margin-bottom: 1rem;
-        filter: drop-shadow(0 4px 8px rgba(139, 69, 19, 0.3));
-    }
-    
-    .main-title {
-        font-size: 3.5rem;
-        color: #5D4E37;
-        font-weight: 300;
-        margin-bottom: 0.5rem;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .subtitle {
-        font-size: 1.4rem;
-        color: #7B6143;
-        font-style: italic;
-        margin-bottom: 2rem;
-    }
-    
-    /* Content card styling */
-    .content-card {
-        background: rgba(255, 255, 255, 0.95);
-        border-radius: 15px;
-        padding: 2.5rem;
-        margin: 1.5rem 0;
-        box-shadow: 0 8px 32px rgba(139, 69, 19, 0.15);
-        border: 1px solid rgba(139, 69, 19, 0.1);
-        backdrop-filter: blur(10px);
-    }
-    
-    /* Question styling */
-    .question-container {
-        background: rgba(245, 243, 240, 0.8);
-        border-radius: 12px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        border-left: 4px solid #8B4513;
-    }
-    
-    .question-number {
-        font-size: 1rem;
-        color: #8B4513;
-        font-weight: bold;
-        letter-spacing: 2px;
-        margin-bottom: 1rem;
-    }
-    
-    .question-text {
-        font-size: 1.5rem;
-        color: #5D4E37;
-        line-height: 1.6;
-        margin-bottom: 1.5rem;
-        font-weight: 500;
-    }
-    
-    /* Option styling */
-    .option-card {
-        background: rgba(255, 255, 255, 0.9);
-        border: 2px solid rgba(139, 69, 19, 0.2);
-        border-radius: 10px;
-        padding: 1.5rem;
-        margin: 0.8rem 0;
-        transition: all 0.3s ease;
-        cursor: pointer;
-    }
-    
-    .option-card:hover {
-        border-color: rgba(139, 69, 19, 0.5);
-        box-shadow: 0 4px 15px rgba(139, 69, 19, 0.2);
-        transform: translateY(-2px);
-    }
-    
-    .option-title {
-        font-weight: 600;
-        color: #5D4E37;
-        font-size: 1.2rem;
-        margin-bottom: 0.5rem;
-    }
-    
-    .option-keywords {
-        color: #8B4513;
-        font-size: 1rem;
-        font-style: italic;
-    }
-    
-    /* Zen quote styling */
-    .zen-quote {
-        font-style: italic;
-        color: #7B6143;
-        text-align: center;
-        margin: 2rem 0;
-        padding: 1.5rem;
-        background: rgba(139, 69, 19, 0.08);
-        border-left: 4px solid #8B4513;
-        border-radius: 8px;
-        font-size: 1.1rem;
-        line-height: 1.7;
-    }
-    
-    /* Results styling */
-    .technique-title {
-        font-size: 2.2rem;
-        color: #5D4E37;
-        text-align: center;
-        margin-bottom: 1.5rem;
-        font-weight: 400;
-    }
-    
-    .technique-description {
-        font-size: 1.2rem;
-        color: #6B5B47;
-        line-height: 1.7;
-        margin-bottom: 2rem;
-    }
-    
-    .day-section {
-        background: rgba(139, 69, 19, 0.1);
-        border-radius: 12px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        border-left: 4px solid #8B4513;
-    }
-    
-    .day-title {
-        font-size: 1.6rem;
-        color: #5D4E37;
-        font-weight: 600;
-        margin-bottom: 1.5rem;
-    }
-    
-    .practice-section {
-        margin-bottom: 1.5rem;
-    }
-    
-    .practice-label {
-        font-weight: 600;
-        color: #8B4513;
-        font-size: 1.1rem;
-        margin-bottom: 0.5rem;
-    }
-    
-    .practice-content {
-        color: #6B5B47;
-        line-height: 1.6;
-        font-size: 1.05rem;
-    }
-    
-    /* Progress bar */
-    .progress-container {
-        background: rgba(139, 69, 19, 0.2);
-        border-radius: 10px;
-        height: 12px;
-        margin: 2rem 0;
-        overflow: hidden;
-    }
-    
-    .progress-bar {
-        background: linear-gradient(90deg, #8B4513, #A0522D);
-        height: 100%;
-        border-radius: 10px;
-        transition: width 0.5s ease;
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        background: linear-gradient(135deg, #8B4513 0%, #A0522D 100%);
-        color: white;
-        border: none;
-        border-radius: 25px;
-        padding: 0.8rem 2rem;
-        font-size: 1.1rem;
-        font-weight: 500;
-        transition: all 0.3s ease;
-        font-family: 'Crimson Text', serif;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 20px rgba(139, 69, 19, 0.4);
-    }
-    
-    /* Hide Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    .stDeployButton {display:none;}
-    
-    /* Radio button styling */
-    .stRadio > div {
-        gap: 1rem;
-    }
-    
-    /* Custom spacing */
-    .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Buddhist aesthetic from static/style.css. Streamlit serves static files other
+# than images as text/plain, which browsers will not apply as a stylesheet, so
+# the CSS is sent inline instead, once per session (see inject_stylesheet)
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "style.css")
+STYLESHEET_ID = "equanimity-style"
 
 # API Configuration
-API_BASE_URL = "http://localhost:8000"  # Change this for production
-
-# Questions data
-QUESTIONS = [
-    {
-        "number": 1,
-        "text": "When facing unexpected challenges or setbacks, what is your most natural response?",
-        "options": [
-            ("I feel immediately overwhelmed and react strongly", "reactive, overwhelming, scattered, intense, turbulent"),
-            ("I become anxious and worry about outcomes", "anxious, worried, uncertain, restless, concerned"),
-            ("I pause to analyze and plan my response", "analyzing, planning, methodical, logical, structured"),
-            ("I accept what is and adapt with minimal resistance", "accepting, flowing, adaptable, resilient, balanced")
-        ]
-    },
-    {
-        "number": 2,
-        "text": "How do you typically respond to criticism or negative feedback from others?",
-        "options": [
-            ("I feel hurt and become defensive", "defensive, hurt, rejected, wounded, protective"),
-            ("I ruminate and question my self-worth", "ruminating, doubting, questioning, insecure, overthinking"),
-            ("I evaluate if there's truth to consider", "evaluating, discerning, selective, rational, measured"),
-            ("I receive it as information for growth", "grateful, learning, growing, open, receptive")
-        ]
-    },
-    {
-        "number": 3,
-        "text": "When experiencing intense emotions (anger, sadness, fear), what best describes your relationship with them?",
-        "options": [
-            ("I become completely consumed by the emotion", "consumed, identified, merged, lost, overwhelmed"),
-            ("I try to suppress or avoid the feeling", "suppressing, avoiding, numbing, escaping, denying"),
-            ("I work through it with effort and understanding", "understanding, processing, working, healing, therapeutic"),
-            ("I observe it with spacious awareness", "witnessing, observing, spacious, present, aware")
-        ]
-    },
-    {
-        "number": 4,
-        "text": "How do you approach situations where you cannot control the outcome?",
-        "options": [
-            ("I fight harder to maintain control", "fighting, forcing, pushing, struggling, resisting"),
-            ("I feel frustrated and helpless", "frustrated, helpless, powerless, defeated, stuck"),
-            ("I focus on what I can influence", "focusing, manageable, practical, actionable, organized"),
-            ("I surrender to the flow of life", "surrendering, trusting, releasing, peaceful, flowing")
-        ]
-    },
-    {
-        "number": 5,
-        "text": "What is your relationship with pleasure and success versus pain and failure?",
-        "options": [
-            ("I cling to pleasure and desperately avoid pain", "clinging, addicted, desperate, dependent, attached"),
-            ("I swing between highs and lows dramatically", "swinging, unstable, moody, reactive, volatile"),
-            ("I try to maintain balance through discipline", "moderating, balancing, managing, controlled, disciplined"),
-            ("I remain relatively unchanged by either", "equanimous, steady, unchanged, centered, stable")
-        ]
-    }
-]
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000").rstrip("/")
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+API_RETRIES = int(os.getenv("API_RETRIES", "3"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "20"))
+# Longest total wait the frontend accepts when the API answers 429/503 with Retry-After
+API_MAX_RETRY_AFTER = float(os.getenv("API_MAX_RETRY_AFTER", "30"))
+
+# "stream" renders sections as they arrive; "jobs" submits a background job and polls it
+GENERATION_MODE = os.getenv("GENERATION_MODE", "stream")
+JOB_POLL_WAIT_SECONDS = 20
+JOB_DEADLINE_SECONDS = 180
+
+# How long the question bank is used before it is revalidated against its ETag
+QUESTION_BANK_TTL_SECONDS = int(os.getenv("QUESTION_BANK_TTL_SECONDS", "300"))
+
+# Frontend memoization of generated plans, shared by every session in this process
+PLAN_CACHE_TTL_SECONDS = int(os.getenv("PLAN_CACHE_TTL_SECONDS", "86400"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1024"))
+
+# Display order of technique sections while they stream in
+SECTION_ORDER = ['technique_title', 'description', 'zen_quote', 'insight', 'day1', 'day2', 'day3', 'long_term_guidance']
+
+@st.cache_resource
+def load_stylesheet() -> str:
+    with open(STYLESHEET_PATH, encoding="utf-8") as f:
+        return f.read()
+
+def inject_stylesheet():
+    """
+    Add the stylesheet to the page <head> on a session's first run. A <style>
+    written with st.markdown is removed by the next rerun that does not repeat
+    it; one in the head, outside Streamlit's elements, lasts for the session.
+    """
+    if st.session_state.get("stylesheet_injected"):
+        return
+    st.session_state.stylesheet_injected = True
+    components.html(f"""<script>
+const doc = window.parent.document;
+if (!doc.getElementById({json.dumps(STYLESHEET_ID)})) {{
+    const style = doc.createElement("style");
+    style.id = {json.dumps(STYLESHEET_ID)};
+    style.textContent = {json.dumps(load_stylesheet())};
+    doc.head.appendChild(style);
+}}
+</script>""", height=0)
 
 def render_header():
     """Render the beautiful header with lotus symbol"""
@@ -303,9 +86,9 @@ def render_intro():
     """Render the introduction section"""
     st.markdown("""
     <div class="content-card">
-        <h2 style="color: #5D4E37; text-align: center; font-size: 2.2rem; margin-bottom: 2rem;">Understanding Equanimity</h2>
+        <h2 class="intro-title">Understanding Equanimity</h2>
         
-        <p style="font-size: 1.2rem; line-height: 1.7; color: #6B5B47; margin-bottom: 1.5rem;">
+        <p class="intro-text">
         Equanimity is one of Buddhism's most profound teachings—a state of mental calmness and composure, especially in difficult situations. It represents balanced awareness, neither grasping at pleasant experiences nor pushing away unpleasant ones.
         </p>
         
@@ -313,82 +96,312 @@ def render_intro():
             "In the midst of winter, I found there was, within me, an invincible summer." - Albert Camus
         </div>
         
-        <p style="font-size: 1.2rem; line-height: 1.7; color: #6B5B47; margin-bottom: 1.5rem;">
+        <p class="intro-text">
         This quality of mind allows us to remain centered and wise regardless of external circumstances. Equanimity isn't indifference—it's engaged peace, responding to life with clarity rather than reactivity.
         </p>
         
-        <p style="font-size: 1.2rem; line-height: 1.7; color: #6B5B47; margin-bottom: 2rem;">
+        <p class="intro-text">
         <strong>Why Equanimity Matters:</strong> It frees us from the exhausting cycle of emotional highs and lows, reduces suffering caused by attachment and aversion, and enables clearer decision-making and deeper compassion.
         </p>
     </div>
     """, unsafe_allow_html=True)
 
-def render_question(question_data, question_key):
+def render_question(question_data, question_key, question_count):
     """Render a single question with options"""
     st.markdown(f"""
     <div class="question-container">
-        <div class="question-number">QUESTION {question_data['number']} OF 5</div>
+        <div class="question-number">QUESTION {question_data['number']} OF {question_count}</div>
         <div class="question-text">{question_data['text']}</div>
     </div>
     """, unsafe_allow_html=True)
     
-    # Create radio button options
-    option_labels = [opt[0] for opt in question_data['options']]
-    
-    selected = st.radio(
-        "",
-        option_labels,
+    # Keywords are shown as captions so the choice is explained without a rerun
+    st.radio(
+        question_data['text'],
+        [option['id'] for option in question_data['options']],
+        index=None,
         key=question_key,
+        format_func=lambda option_id: question_data['options'][option_id]['text'],
+        captions=[f"Keywords: {option['keywords']}" for option in question_data['options']],
         label_visibility="collapsed"
     )
+
+def submit_assessment(questions: List[Dict[str, Any]]):
+    """Form callback: store the option id of every answered question"""
+    answers = {}
+    for question_data in questions:
+        selected = st.session_state.get(f"question_{question_data['number']}")
+        if selected is not None:
+            answers[question_data['id']] = selected
+    st.session_state.answers = answers
+    if len(answers) == len(questions):
+        st.session_state.current_step = 'generating'
+
+def render_assessment(bank: Dict[str, Any]):
+    """
+    Render every question in a single form. Choosing options happens in the
+    browser; the script reruns once, when the form is submitted.
+    """
+    questions = bank['questions']
+    with st.form("assessment"):
+        for question_data in questions:
+            render_question(question_data, f"question_{question_data['number']}", len(questions))
+        
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col3:
+            submitted = st.form_submit_button("✨ Generate Practice", type="primary",
+                                              on_click=submit_assessment, args=(questions,))
     
-    # Display selected option with keywords
-    if selected:
-        for option_text, keywords in question_data['options']:
-            if option_text == selected:
-                st.markdown(f"""
-                <div style="background: rgba(139, 69, 19, 0.1); padding: 1rem; border-radius: 8px; margin: 1rem 0;">
-                    <strong style="color: #5D4E37;">Selected:</strong> {option_text}<br>
-                    <em style="color: #8B4513;">Keywords: {keywords}</em>
-                </div>
-                """, unsafe_allow_html=True)
-                return keywords
-    
-    return None
+    # The callback has already moved a complete submission on to generating
+    if submitted:
+        answered = len(st.session_state.answers)
+        st.warning(f"Please answer every question ({answered} of {len(questions)} answered).")
 
-def render_progress_bar(current_question, total_questions):
-    """Render progress bar"""
-    progress = (current_question - 1) / total_questions * 100
-    st.markdown(f"""
-    <div class="progress-container">
-        <div class="progress-bar" style="width: {progress}%;"></div>
-    </div>
-    <p style="text-align: center; color: #8B4513; font-weight: 500;">
-        Progress: {current_question - 1} of {total_questions} questions completed
-    </p>
-    """, unsafe_allow_html=True)
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Keep-alive session shared by every user session in this server process"""
+    retry = Retry(
+        total=API_RETRIES,
+        connect=API_RETRIES,
+        read=API_RETRIES,
+        status=API_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=API_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-def call_api(answers: Dict[str, str]):
-    """Call the FastAPI backend to generate technique"""
-    try:
-        response = requests.post(
-            f"{API_BASE_URL}/generate-technique",
-            json={"answers": answers},
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        st.error("❌ **Connection Error**: Cannot connect to the API server. Please ensure the FastAPI server is running on http://localhost:8000")
+@st.cache_resource
+def last_question_bank() -> Dict[str, Any]:
+    """
+    The last question bank fetched and its ETag, revalidated with If-None-Match.
+    A cached resource, because reruns execute this script in a fresh namespace.
+    """
+    return {}
+
+@st.cache_data(ttl=QUESTION_BANK_TTL_SECONDS, show_spinner=False)
+def get_question_bank() -> Dict[str, Any]:
+    """The backend's question bank; raises RequestException when it cannot be fetched"""
+    previous = last_question_bank()
+    headers = {"If-None-Match": previous["etag"]} if previous.get("etag") else {}
+    response = get_http_session().get(
+        f"{API_BASE_URL}/questions",
+        headers=headers,
+        timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+    )
+    if response.status_code == 304 and "bank" in previous:
+        return previous["bank"]
+    response.raise_for_status()
+    previous.update(etag=response.headers.get("ETag"), bank=response.json())
+    return previous["bank"]
+
+def profile_for_answers(bank: Dict[str, Any], answers: Dict[str, int]) -> Optional[int]:
+    """Index of a complete answer set in the bank's profile space (first question varies fastest)"""
+    index = 0
+    for question_data in reversed(bank['questions']):
+        if question_data['id'] not in answers:
+            return None
+        index = index * len(question_data['options']) + answers[question_data['id']]
+    return index
+
+def answers_for_profile(bank: Dict[str, Any], index: int) -> Optional[Dict[str, int]]:
+    """Inverse of profile_for_answers; None when the index is out of range"""
+    answers = {}
+    for question_data in bank['questions']:
+        index, option = divmod(index, len(question_data['options']))
+        answers[question_data['id']] = option
+    return answers if index == 0 else None
+
+def show_request_error(error: requests.exceptions.RequestException):
+    """Explain a failed backend request to the user"""
+    if isinstance(error, requests.exceptions.ConnectionError):
+        st.error(f"❌ **Connection Error**: Cannot connect to the API server. Please ensure the FastAPI server is running on {API_BASE_URL}")
         st.info("💡 **To start the server**: Run `uvicorn main:app --reload` in your terminal")
+    elif isinstance(error, requests.exceptions.Timeout):
+        st.error("⏱️ **Timeout Error**: The AI is taking longer than expected. Please try again.")
+    elif error.response is not None and error.response.status_code == 422 and "question bank" in error.response.text.lower():
+        # Questions changed since this session loaded them; the next run fetches the new ones
+        get_question_bank.clear()
+        st.warning("🪷 **The questions have been updated.** Please reload the page and answer them again.")
+    elif retry_after_seconds(error.response) is not None:
+        show_busy(retry_after_seconds(error.response))
+    else:
+        st.error(f"🚨 **API Error**: {str(error)}")
+
+def show_busy(wait: float):
+    """Tell the user the backend is at capacity and when to try again"""
+    st.warning(f"🪷 **Many people are practicing right now.** Please take a few breaths and try again in about {wait:.0f} seconds.")
+
+def log_timing(response, started: float):
+    """Log the backend's Server-Timing stages next to the client-side round trip"""
+    rtt_ms = (time.perf_counter() - started) * 1000
+    server_timing = response.headers.get("Server-Timing", "n/a")
+    trace_id = response.headers.get("X-Trace-Id", "-")
+    print(f"API timing {response.request.method} {response.url}: client_rtt={rtt_ms:.1f}ms server=[{server_timing}] trace={trace_id}")
+
+def retry_after_seconds(response) -> Optional[float]:
+    """Seconds to wait before retrying a 429/503 response that says so, else None"""
+    if response is None or response.status_code not in (429, 503):
         return None
-    except requests.exceptions.Timeout:
+    try:
+        return max(0.0, float(response.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
+def post_api(path: str, **kwargs) -> requests.Response:
+    """
+    POST to the backend as this user's session. Requests the backend turns away
+    with Retry-After are retried after that delay, as long as the total wait
+    stays within API_MAX_RETRY_AFTER; otherwise the 429/503 response is returned.
+    """
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    headers = {"X-Client-Id": st.session_state.client_id}
+    notice = st.empty()
+    waited = 0.0
+    while True:
+        response = get_http_session().post(f"{API_BASE_URL}{path}", headers=headers, **kwargs)
+        wait = retry_after_seconds(response)
+        if wait is None or waited + wait > API_MAX_RETRY_AFTER:
+            notice.empty()
+            return response
+        response.close()
+        notice.info(f"🪷 Many people are practicing right now. Your plan will begin in about {wait:.0f} seconds...")
+        time.sleep(wait)
+        waited += wait
+
+def submit_job(answers: Dict[str, int], bank_version: str) -> str:
+    """Queue a generation job and return its id"""
+    started = time.perf_counter()
+    response = post_api(
+        "/jobs",
+        json={"answers": answers, "question_bank": bank_version},
+        timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+    )
+    log_timing(response, started)
+    response.raise_for_status()
+    return response.json()["job_id"]
+
+def call_api(answers: Dict[str, int], bank_version: str):
+    """
+    Submit a generation job to the FastAPI backend and long-poll until it finishes.
+    A job the backend turned away for capacity is resubmitted after its
+    retry_after, within the same API_MAX_RETRY_AFTER budget as post_api.
+    """
+    try:
+        job_id = submit_job(answers, bank_version)
+        notice = st.empty()
+        waited = 0.0
+        deadline = time.monotonic() + JOB_DEADLINE_SECONDS
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = get_http_session().get(
+                f"{API_BASE_URL}/jobs/{job_id}",
+                params={"wait": JOB_POLL_WAIT_SECONDS},
+                timeout=(API_CONNECT_TIMEOUT, JOB_POLL_WAIT_SECONDS + API_READ_TIMEOUT)
+            )
+            log_timing(response, started)
+            response.raise_for_status()
+            job = response.json()
+            if job["status"] == "done":
+                notice.empty()
+                return job["result"]
+            if job["status"] == "failed":
+                wait = job.get("retry_after")
+                if wait is None:
+                    notice.empty()
+                    st.error(f"🚨 **API Error**: {job['error']}")
+                    return None
+                if waited + wait > API_MAX_RETRY_AFTER:
+                    notice.empty()
+                    show_busy(wait)
+                    return None
+                notice.info(f"🪷 Many people are practicing right now. Your plan will begin in about {wait:.0f} seconds...")
+                time.sleep(wait)
+                waited += wait
+                job_id = submit_job(answers, bank_version)
+
         st.error("⏱️ **Timeout Error**: The AI is taking longer than expected. Please try again.")
         return None
     except requests.exceptions.RequestException as e:
-        st.error(f"🚨 **API Error**: {str(e)}")
+        show_request_error(e)
         return None
 
+def iter_sse(response):
+    """Yield (event, data) pairs from a Server-Sent Events response"""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+def stream_api(answers: Dict[str, int], bank_version: str):
+    """Stream the technique from the backend, rendering each section as it arrives"""
+    slots = {name: st.empty() for name in SECTION_ORDER}
+    try:
+        started = time.perf_counter()
+        with post_api(
+            "/generate-technique/stream",
+            json={"answers": answers, "question_bank": bank_version},
+            stream=True,
+            timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+        ) as response:
+            response.raise_for_status()
+            for event, data in iter_sse(response):
+                if event == "section" and data["name"] in slots:
+                    with slots[data["name"]].container():
+                        render_section(data["name"], data["value"])
+                elif event == "complete":
+                    log_timing(response, started)
+                    return data["technique"]
+                elif event == "error":
+                    st.error(f"🚨 **API Error**: {data['detail']}")
+                    return None
+    except requests.exceptions.RequestException as e:
+        show_request_error(e)
+    return None
+
+# Plans fetched during this script run, waiting to be stored by remembered_plan
+_fresh_plans: Dict[Tuple[str, Tuple[Tuple[str, int], ...]], Dict] = {}
+
+@st.cache_data(ttl=PLAN_CACHE_TTL_SECONDS, max_entries=PLAN_CACHE_MAX_ENTRIES, show_spinner=False)
+def remembered_plan(bank_version: str, answer_items: Tuple[Tuple[str, int], ...]) -> Dict:
+    """Plans already fetched by this server; raises LookupError on a miss so nothing is cached"""
+    plan = _fresh_plans.pop((bank_version, answer_items), None)
+    if plan is None:
+        raise LookupError("plan not fetched yet")
+    return plan
+
+def get_technique(answers: Dict[str, int], bank_version: str) -> Optional[Dict]:
+    """The plan for these answers, calling the backend only when it is not memoized"""
+    # Option ids are already canonical, so sorting them gives the memoization key
+    answer_items = tuple(sorted(answers.items()))
+    try:
+        return remembered_plan(bank_version, answer_items)
+    except LookupError:
+        pass
+
+    if GENERATION_MODE == "jobs":
+        technique_data = call_api(answers, bank_version)
+    else:
+        technique_data = stream_api(answers, bank_version)
+
+    if technique_data:
+        # Prime the memo so reloads, Back and identical retakes are free
+        _fresh_plans[(bank_version, answer_items)] = technique_data
+        remembered_plan(bank_version, answer_items)
+    return technique_data
+
 def render_technique(technique_data):
     """Render the generated technique"""
     st.markdown(f"""
@@ -402,57 +415,101 @@ def render_technique(technique_data):
             "{technique_data['zen_quote']}"
         </div>
         
-        <div style="background: rgba(139, 69, 19, 0.08); padding: 1.5rem; border-radius: 10px; margin: 1.5rem 0;">
-            <strong style="color: #5D4E37; font-size: 1.1rem;">Key Insight:</strong>
-            <p style="margin-top: 0.5rem; font-style: italic; color: #6B5B47;">{technique_data['insight']}</p>
+        <div class="insight-box">
+            <strong>Key Insight:</strong>
+            <p>{technique_data['insight']}</p>
         </div>
     </div>
     """, unsafe_allow_html=True)
     
     # Render each day
     for day_num in [1, 2, 3]:
-        day_data = technique_data[f'day{day_num}']
-        st.markdown(f"""
-        <div class="day-section">
-            <div class="day-title">Day {day_num}: {day_data['title']}</div>
-            
-            <div class="practice-section">
-                <div class="practice-label">🌅 Morning Practice (10-15 minutes):</div>
-                <div class="practice-content">{day_data['morning_practice']}</div>
-            </div>
-            
-            <div class="practice-section">
-                <div class="practice-label">🌞 Daily Integration:</div>
-                <div class="practice-content">{day_data['daily_integration']}</div>
-            </div>
-            
-            <div class="practice-section">
-                <div class="practice-label">🌙 Evening Reflection:</div>
-                <div class="practice-content">{day_data['evening_reflection']}</div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        render_day(day_num, technique_data[f'day{day_num}'])
     
     # Long-term guidance
+    render_guidance(technique_data['long_term_guidance'])
+
+def render_day(day_num, day_data):
+    """Render one day of the practice"""
+    st.markdown(f"""
+    <div class="day-section">
+        <div class="day-title">Day {day_num}: {day_data['title']}</div>
+        
+        <div class="practice-section">
+            <div class="practice-label">🌅 Morning Practice (10-15 minutes):</div>
+            <div class="practice-content">{day_data['morning_practice']}</div>
+        </div>
+        
+        <div class="practice-section">
+            <div class="practice-label">🌞 Daily Integration:</div>
+            <div class="practice-content">{day_data['daily_integration']}</div>
+        </div>
+        
+        <div class="practice-section">
+            <div class="practice-label">🌙 Evening Reflection:</div>
+            <div class="practice-content">{day_data['evening_reflection']}</div>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_guidance(guidance):
+    """Render the long-term guidance card"""
     st.markdown(f"""
-    <div class="content-card" style="background: rgba(139, 69, 19, 0.05);">
-        <h3 style="color: #5D4E37; margin-bottom: 1rem;">🌱 Continuing Your Journey</h3>
-        <p style="color: #6B5B47; line-height: 1.7;">{technique_data['long_term_guidance']}</p>
+    <div class="content-card guidance-card">
+        <h3>🌱 Continuing Your Journey</h3>
+        <p>{guidance}</p>
     </div>
     """, unsafe_allow_html=True)
 
+def render_section(name, value):
+    """Render a single technique section streamed from the backend"""
+    if name == 'technique_title':
+        st.markdown(f'<h2 class="technique-title">{value}</h2>', unsafe_allow_html=True)
+    elif name == 'description':
+        st.markdown(f'<div class="technique-description"><p>{value}</p></div>', unsafe_allow_html=True)
+    elif name == 'zen_quote':
+        st.markdown(f'<div class="zen-quote">"{value}"</div>', unsafe_allow_html=True)
+    elif name == 'insight':
+        st.markdown(f"""
+        <div class="insight-box">
+            <strong>Key Insight:</strong>
+            <p>{value}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    elif name in ('day1', 'day2', 'day3'):
+        render_day(int(name[3:]), value)
+    elif name == 'long_term_guidance':
+        render_guidance(value)
+
+def start_assessment():
+    """Button callback: move to the questions without a second rerun"""
+    st.session_state.current_step = 'assessment'
+
 def main():
     """Main app function"""
+    inject_stylesheet()
+
+    # Render header
+    render_header()
+
+    # The questions and their option ids come from the backend
+    try:
+        bank = get_question_bank()
+    except requests.exceptions.RequestException as e:
+        show_request_error(e)
+        return
+
     # Initialize session state
     if 'current_step' not in st.session_state:
         st.session_state.current_step = 'intro'
+        # A returning user's link carries their profile; recall that plan
+        profile = st.experimental_get_query_params().get('profile', [''])[0]
+        answers = answers_for_profile(bank, int(profile)) if profile.isdigit() else None
+        if answers is not None:
+            st.session_state.answers = answers
+            st.session_state.current_step = 'generating'
     if 'answers' not in st.session_state:
         st.session_state.answers = {}
-    if 'current_question' not in st.session_state:
-        st.session_state.current_question = 1
-    
-    # Render header
-    render_header()
     
     # Handle different steps
     if st.session_state.current_step == 'intro':
@@ -460,59 +517,29 @@ def main():
         
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            if st.button("🧘‍♀️ Begin Your Journey", type="primary"):
-                st.session_state.current_step = 'assessment'
-                st.rerun()
+            st.button("🧘‍♀️ Begin Your Journey", type="primary", on_click=start_assessment)
     
     elif st.session_state.current_step == 'assessment':
-        current_q = st.session_state.current_question
-        
-        # Render progress
-        render_progress_bar(current_q, len(QUESTIONS))
-        
-        # Render current question
-        question_data = QUESTIONS[current_q - 1]
-        question_key = f"question_{current_q}"
-        
-        keywords = render_question(question_data, question_key)
-        
-        # Navigation
-        col1, col2, col3 = st.columns([1, 1, 1])
-        
-        with col1:
-            if current_q > 1:
-                if st.button("⬅️ Previous", key="prev_btn"):
-                    st.session_state.current_question -= 1
-                    st.rerun()
-        
-        with col3:
-            if keywords:  # Only show next if option is selected
-                if current_q < len(QUESTIONS):
-                    if st.button("Next ➡️", key="next_btn", type="primary"):
-                        st.session_state.answers[str(current_q)] = keywords
-                        st.session_state.current_question += 1
-                        st.rerun()
-                else:
-                    if st.button("✨ Generate Practice", key="generate_btn", type="primary"):
-                        st.session_state.answers[str(current_q)] = keywords
-                        st.session_state.current_step = 'generating'
-                        st.rerun()
+        render_assessment(bank)
     
     elif st.session_state.current_step == 'generating':
         st.markdown("""
-        <div class="content-card" style="text-align: center;">
-            <h2 style="color: #5D4E37;">🧘‍♂️ Connecting with AI Wisdom Teacher...</h2>
-            <p style="color: #7B6143; font-style: italic; margin: 2rem 0;">
+        <div class="content-card generating-card">
+            <h2>🧘‍♂️ Connecting with AI Wisdom Teacher...</h2>
+            <p>
                 Crafting your personalized practice from ancient Buddhist teachings
             </p>
         </div>
         """, unsafe_allow_html=True)
         
-        # Show spinner
+        # Show spinner while sections stream in
         with st.spinner("Generating your personalized equanimity practice..."):
-            technique_data = call_api(st.session_state.answers)
+            technique_data = get_technique(st.session_state.answers, bank['version'])
         
         if technique_data:
+            index = profile_for_answers(bank, st.session_state.answers)
+            if index is not None:
+                st.experimental_set_query_params(profile=index)
             st.session_state.technique_data = technique_data
             st.session_state.current_step = 'results'
             st.rerun()
\ No newline at end of file
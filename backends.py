@@ -0,0 +1,297 @@
+# backends.py - Pluggable text generation backends
+#
+# MODEL_BACKEND selects the implementation:
+#   gemini  - Google Gemini (default)
+#   stub    - deterministic local responses with STUB_LATENCY, no network
+#   record  - Gemini, saving every response under RECORDINGS_DIR
+#   replay  - responses previously saved by `record`, no network
+#   http    - a model server at MODEL_HTTP_URL, e.g. bench/fake_model.py
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+from prompts import estimate_tokens
+
+
+class ModelBackend:
+    """Blocking text generation; the API runs these calls on its model executor"""
+
+    name = "base"
+    model_name = "base"
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Yield the response in chunks; backends without streaming yield it whole"""
+        yield self.generate(prompt)
+
+    def count_tokens(self, text: str) -> int:
+        """Input tokens for text; an estimate unless the backend has a tokenizer"""
+        return estimate_tokens(text)
+
+
+class GeminiBackend(ModelBackend):
+    """Google Gemini through google-generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: str, api_key: Optional[str]):
+        # The SDK accepts a missing key and only fails on the first call
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY is not set")
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        return self._model.generate_content(prompt).text
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self._model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+    def count_tokens(self, text: str) -> int:
+        return self._model.count_tokens(text).total_tokens
+
+
+class LatencyDistribution:
+    """
+    Latency samples from a spec string:
+    `fixed:SECONDS`, `uniform:MIN:MAX` or `lognormal:MEDIAN:SIGMA`
+    """
+
+    def __init__(self, spec: str, seed: Optional[int] = None):
+        kind, *params = spec.split(':')
+        self.kind = kind
+        self.params = [float(param) for param in params]
+        if kind not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == 'fixed':
+                return self.params[0]
+            if self.kind == 'uniform':
+                return self._random.uniform(self.params[0], self.params[1])
+            median, sigma = self.params
+            return self._random.lognormvariate(0, sigma) * median
+
+
+def stub_response(prompt: str) -> str:
+    """A deterministic technique in the model's JSON format, varying with the prompt"""
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+    themes = ['Grounding Awareness', 'Expanding Presence', 'Embodied Wisdom']
+    technique = {
+        "technique_title": f"The Steady Breath Practice {digest}",
+        "description": "A locally generated practice used for offline testing and benchmarks.",
+        "insight": "Equanimity is the capacity to stay present with whatever arises.",
+        "zen_quote": "Peace comes from within. Do not seek it without. - Buddha",
+        "long_term_guidance": "Keep a short daily sitting practice and notice reactivity without judgment."
+    }
+    for day, theme in enumerate(themes, start=1):
+        technique[f"day{day}"] = {
+            "title": theme,
+            "morning_practice": f"Day {day}: sit for ten minutes with the breath.",
+            "daily_integration": f"Day {day}: pause for three breaths before responding.",
+            "evening_reflection": f"Day {day}: recall one moment of calm and rest in it."
+        }
+    return json.dumps(technique, indent=2)
+
+
+class StubBackend(ModelBackend):
+    """Deterministic local responses in the technique JSON format, with simulated latency"""
+
+    name = "stub"
+    model_name = "stub"
+
+    def __init__(self, latency: LatencyDistribution, chunks: int = 20):
+        self.latency = latency
+        self.chunks = chunks
+
+    def _respond(self, prompt: str) -> str:
+        return stub_response(prompt)
+
+    def generate(self, prompt: str) -> str:
+        time.sleep(self.latency.sample())
+        return self._respond(prompt)
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        text = self._respond(prompt)
+        delay = self.latency.sample() / self.chunks
+        size = max(1, len(text) // self.chunks + 1)
+        for start in range(0, len(text), size):
+            time.sleep(delay)
+            yield text[start:start + size]
+
+
+class ModelHTTPError(Exception):
+    """A non-200 answer from an HTTP model server; `code` 429 means quota"""
+
+    def __init__(self, code: int, detail: str):
+        super().__init__(f"Model server returned {code}: {detail}")
+        self.code = code
+
+
+class HTTPBackend(ModelBackend):
+    """A model behind a plain HTTP API: POST {"prompt": ...} answered with {"text": ...}"""
+
+    name = "http"
+    model_name = "http"
+
+    def __init__(self, url: str, timeout: float = 60, pool_size: int = 32):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def generate(self, prompt: str) -> str:
+        response = self._session.post(self.url, json={"prompt": prompt}, timeout=self.timeout)
+        if response.status_code != 200:
+            raise ModelHTTPError(response.status_code, response.text[:200])
+        return response.json()["text"]
+
+
+class RecordReplayBackend(ModelBackend):
+    """Save responses of a live backend to disk, or replay saved responses offline"""
+
+    def __init__(self, directory: str, mode: str, inner: Optional[ModelBackend] = None,
+                 model_name: str = "gemini-pro", replay_latency: bool = True):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == 'record' and inner is None:
+            raise ValueError("Recording needs a live backend to wrap")
+        self.name = mode
+        self.mode = mode
+        self.directory = directory
+        self.inner = inner
+        self.model_name = inner.model_name if inner is not None else model_name
+        self.replay_latency = replay_latency
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def generate(self, prompt: str) -> str:
+        path = self._path(prompt)
+        if self.mode == 'replay':
+            if not os.path.exists(path):
+                raise LookupError(f"No recorded response for this prompt ({os.path.basename(path)})")
+            with open(path, encoding='utf-8') as f:
+                recording = json.load(f)
+            if self.replay_latency:
+                time.sleep(recording.get("latency", 0))
+            return recording["response"]
+
+        started = time.perf_counter()
+        response = self.inner.generate(prompt)
+        recording = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "response": response,
+            "latency": round(time.perf_counter() - started, 3)
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(recording, f, indent=2)
+        os.replace(tmp_path, path)
+        return response
+
+    def count_tokens(self, text: str) -> int:
+        if self.inner is not None:
+            return self.inner.count_tokens(text)
+        return estimate_tokens(text)
+
+
+class LazyBackend(ModelBackend):
+    """
+    A backend built on first use, so importing the API does not pay for SDK
+    imports and client setup. A failed build is retried by the next use.
+    """
+
+    def __init__(self, factory: Callable[[], ModelBackend], name: str, model_name: str):
+        self.name = name
+        self.model_name = model_name
+        self.error: Optional[str] = None
+        self.init_seconds: Optional[float] = None
+        self._factory = factory
+        self._backend: Optional[ModelBackend] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._backend is not None
+
+    def load(self) -> ModelBackend:
+        """The underlying backend, building it now if needed (blocking)"""
+        if self._backend is not None:
+            return self._backend
+        with self._lock:
+            if self._backend is None:
+                started = time.perf_counter()
+                try:
+                    self._backend = self._factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.error = None
+                self.init_seconds = round(time.perf_counter() - started, 3)
+        return self._backend
+
+    def generate(self, prompt: str) -> str:
+        return self.load().generate(prompt)
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        return self.load().generate_stream(prompt)
+
+    def count_tokens(self, text: str) -> int:
+        return self.load().count_tokens(text)
+
+
+def create_lazy_backend(gemini_model_name: str) -> LazyBackend:
+    """The backend selected by MODEL_BACKEND, built on first use"""
+    kind = os.getenv('MODEL_BACKEND', 'gemini').lower()
+    if kind not in ('gemini', 'stub', 'record', 'replay', 'http'):
+        raise ValueError(f"Unknown MODEL_BACKEND: {kind}")
+    model_name = {'stub': StubBackend.model_name, 'http': HTTPBackend.model_name}.get(kind, gemini_model_name)
+    return LazyBackend(lambda: create_backend(gemini_model_name), kind, model_name)
+
+
+def create_backend(gemini_model_name: str) -> ModelBackend:
+    """Build the backend selected by MODEL_BACKEND"""
+    kind = os.getenv('MODEL_BACKEND', 'gemini').lower()
+    if kind == 'stub':
+        latency = LatencyDistribution(
+            os.getenv('STUB_LATENCY', 'lognormal:2.0:0.4'),
+            seed=int(os.environ['STUB_SEED']) if os.getenv('STUB_SEED') else None
+        )
+        return StubBackend(latency)
+    if kind == 'http':
+        return HTTPBackend(os.getenv('MODEL_HTTP_URL', 'http://127.0.0.1:8100/generate'))
+
+    recordings_dir = os.getenv('RECORDINGS_DIR', 'recordings')
+    if kind == 'replay':
+        return RecordReplayBackend(
+            recordings_dir, 'replay',
+            model_name=gemini_model_name,
+            replay_latency=os.getenv('REPLAY_LATENCY', 'recorded') == 'recorded'
+        )
+
+    gemini = GeminiBackend(gemini_model_name, os.getenv('GEMINI_API_KEY'))
+    if kind == 'record':
+        return RecordReplayBackend(recordings_dir, 'record', inner=gemini)
+    if kind != 'gemini':
+        raise ValueError(f"Unknown MODEL_BACKEND: {kind}")
+    return gemini
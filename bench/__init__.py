@@ -0,0 +1,6 @@
+# bench - End-to-end benchmark suite
+#
+#   fake_model.py - local model server with configurable latency and errors
+#   workload.py   - assessment mixes drawn from the QUESTIONS option space
+#   run.py        - starts both servers, drives load, writes JSON results
+#   compare.py    - diffs two result files, e.g. from two commits
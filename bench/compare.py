@@ -0,0 +1,85 @@
+# bench/compare.py - Compare two bench/run.py result files
+#
+# Usage:
+#   python -m bench.compare before.json after.json --threshold 10
+#
+# Prints each metric per concurrency level with its relative change. With
+# --threshold, exits 1 when throughput drops or p95/p99 latency, fallback
+# rate or memory grows by more than that many percent.
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+# Metric -> (path in a level, whether higher is better)
+METRICS: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "rps": (("rps",), True),
+    "p50_ms": (("latency_ms", "p50"), False),
+    "p95_ms": (("latency_ms", "p95"), False),
+    "p99_ms": (("latency_ms", "p99"), False),
+    "error_rate": (("error_rate",), False),
+    "fallback_rate": (("fallback_rate",), False),
+    "max_rss_mb": (("memory", "max_rss_mb"), False)
+}
+
+# Metrics that decide --threshold regressions
+GATED = ("rps", "p95_ms", "p99_ms", "fallback_rate", "max_rss_mb")
+
+
+def lookup(level: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    value: Any = level
+    for key in path:
+        if not isinstance(value, dict) or value.get(key) is None:
+            return None
+        value = value[key]
+    return value
+
+
+def change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    """Relative change in percent; None when it is undefined"""
+    if before is None or after is None:
+        return None
+    if before == 0:
+        return 0.0 if after == 0 else None
+    return (after - before) / before * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, help="fail on regressions larger than this percentage")
+    args = parser.parse_args()
+
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+    if before.get("config") != after.get("config"):
+        print("Warning: the runs used different configurations", file=sys.stderr)
+
+    print(f"{before['revision'].get('commit')} -> {after['revision'].get('commit')}")
+    before_levels = {level["concurrency"]: level for level in before["levels"]}
+    regressions = []
+    for level in after["levels"]:
+        concurrency = level["concurrency"]
+        old = before_levels.get(concurrency)
+        if old is None:
+            continue
+        print(f"\n{concurrency} clients")
+        for name, (path, higher_is_better) in METRICS.items():
+            old_value, new_value = lookup(old, path), lookup(level, path)
+            delta = change(old_value, new_value)
+            shown = f"{delta:+.1f}%" if delta is not None else "n/a"
+            print(f"  {name:<14} {str(old_value):>10} -> {str(new_value):<10} {shown}")
+            worse = delta is not None and (-delta if higher_is_better else delta)
+            if args.threshold is not None and name in GATED and worse and worse > args.threshold:
+                regressions.append(f"{name} at {concurrency} clients ({shown})")
+
+    if regressions:
+        print(f"\nRegressions over {args.threshold}%: " + "; ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# bench/fake_model.py - Local model server for benchmarks
+#
+# Usage:
+#   python -m bench.fake_model --port 8100 --latency lognormal:0.5:0.3 --errors 500=0.02,429=0.01
+#
+# Answers POST /generate {"prompt": ...} with {"text": ...} like the http
+# backend in backends.py expects. Latency follows a STUB_LATENCY-style spec;
+# each request independently fails with the configured probabilities:
+#   500       - HTTP 500
+#   429       - HTTP 429, a quota refusal
+#   malformed - HTTP 200 with truncated JSON, so parsing and repair kick in
+#   hang      - no answer for --hang-seconds, so request budgets run out
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from backends import LatencyDistribution, stub_response
+
+ERROR_KINDS = ('500', '429', 'malformed', 'hang')
+
+
+def parse_errors(spec: str) -> Dict[str, float]:
+    """`500=0.02,429=0.01` -> {'500': 0.02, '429': 0.01}"""
+    errors = {}
+    for item in filter(None, spec.split(',')):
+        kind, _, probability = item.partition('=')
+        if kind not in ERROR_KINDS:
+            raise ValueError(f"Unknown error kind {kind!r}; expected one of {', '.join(ERROR_KINDS)}")
+        errors[kind] = float(probability)
+    if sum(errors.values()) > 1:
+        raise ValueError("Error probabilities add up to more than 1")
+    return errors
+
+
+class FakeModel:
+    """Latency and error sampling shared by the server's handler threads"""
+
+    def __init__(self, latency: str, errors: Dict[str, float], hang_seconds: float = 120,
+                 seed: Optional[int] = None):
+        self.latency = LatencyDistribution(latency, seed=seed)
+        self.errors = errors
+        self.hang_seconds = hang_seconds
+        self.requests = 0
+        self.failures = {kind: 0 for kind in ERROR_KINDS}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def outcome(self) -> Optional[str]:
+        """The error this request should produce, if any"""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            for kind, probability in self.errors.items():
+                if roll < probability:
+                    self.failures[kind] += 1
+                    return kind
+                roll -= probability
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        return {"requests": self.requests, "failures": dict(self.failures)}
+
+
+def make_handler(model: FakeModel):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status: int, body: Dict[str, object]) -> None:
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send(200, model.stats())
+            else:
+                self._send(404, {"detail": "Not found"})
+
+        def do_POST(self):
+            if self.path != '/generate':
+                self._send(404, {"detail": "Not found"})
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            prompt = json.loads(self.rfile.read(length) or b'{}').get('prompt', '')
+            outcome = model.outcome()
+            time.sleep(model.hang_seconds if outcome == 'hang' else model.latency.sample())
+            if outcome == '500':
+                self._send(500, {"detail": "Injected server error"})
+            elif outcome == '429':
+                self._send(429, {"detail": "Injected quota error"})
+            else:
+                text = stub_response(prompt)
+                self._send(200, {"text": text[:len(text) // 2] if outcome == 'malformed' else text})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake model server with configurable latency and errors")
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--latency', default='lognormal:0.5:0.3', help="fixed:S, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--errors', default='', help="e.g. 500=0.02,429=0.01,malformed=0.01,hang=0.005")
+    parser.add_argument('--hang-seconds', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    model = FakeModel(args.latency, parse_errors(args.errors), args.hang_seconds, args.seed)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(model))
+    server.daemon_threads = True
+    print(f"Fake model listening on http://127.0.0.1:{args.port}/generate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
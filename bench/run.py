@@ -0,0 +1,259 @@
+# bench/run.py - End-to-end benchmark of the API against a fake model server
+#
+# Usage:
+#   python -m bench.run --levels 1 4 16 --requests 200 --mix uniform --output results.json
+#
+# Starts bench/fake_model.py and the API (through serve.py, MODEL_BACKEND=http)
+# in a fresh temporary directory, then for each concurrency level sends
+# --requests assessments from the chosen mix with that many clients.
+# Results are JSON on stdout (and in --output): latency percentiles,
+# throughput, fallback rate, where plans came from, status codes and memory
+# per worker. The same arguments and seed send the same requests, so two
+# result files can be diffed with `python -m bench.compare`.
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from bench.workload import MIXES, workload
+from loadtest import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} did not answer 200 within {timeout}s")
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def proc_status(pid: int) -> Dict[str, int]:
+    """Memory fields (kB) of a process from /proc"""
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('VmRSS', 'VmHWM'):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def worker_pids(server_pid: int) -> List[int]:
+    """uvicorn worker processes under the server, or the server itself with one worker"""
+    workers = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline", 'rb') as f:
+                cmdline = f.read()
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == server_pid and b'spawn_main' in cmdline:
+            workers.append(int(entry))
+    return sorted(workers) or [server_pid]
+
+
+def worker_memory(server_pid: int) -> Optional[Dict[str, Any]]:
+    """Resident and peak memory of each worker, in MB; None without /proc"""
+    if not os.path.isdir('/proc'):
+        return None
+    rss, peak = [], []
+    for pid in worker_pids(server_pid):
+        try:
+            status = proc_status(pid)
+        except OSError:
+            continue
+        rss.append(round(status.get('VmRSS', 0) / 1024, 1))
+        peak.append(round(status.get('VmHWM', 0) / 1024, 1))
+    if not rss:
+        return None
+    return {"workers": len(rss), "rss_mb": rss, "peak_mb": peak, "max_rss_mb": max(rss)}
+
+
+def run_level(base_url: str, assessments: List[Dict[str, int]], concurrency: int, timeout: float) -> Dict[str, Any]:
+    session_local = threading.local()
+
+    def session() -> requests.Session:
+        if not hasattr(session_local, 'session'):
+            session_local.session = requests.Session()
+        return session_local.session
+
+    def one_request(answers: Dict[str, int]):
+        started = time.perf_counter()
+        try:
+            response = session().post(f"{base_url}/generate-technique", json={"answers": answers}, timeout=timeout)
+            status, source = str(response.status_code), response.headers.get('X-Technique-Source')
+        except requests.RequestException as e:
+            status, source = type(e).__name__, None
+        return status, source, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, assessments))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for status, _, latency in results if status == '200']
+    sources = Counter(source for status, source, _ in results if status == '200')
+    statuses = Counter(status for status, _, _ in results)
+
+    def ms(value: float) -> float:
+        return round(value * 1000, 1)
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(latencies),
+        "error_rate": round(1 - len(latencies) / len(results), 4) if results else 0.0,
+        "fallback_rate": round(sources.get('degraded', 0) / len(results), 4) if results else 0.0,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(max(latencies)) if latencies else 0.0
+        },
+        "sources": dict(sorted(sources.items(), key=lambda item: str(item[0]))),
+        "statuses": dict(sorted(statuses.items()))
+    }
+
+
+def parse_env(items: List[str]) -> Dict[str, str]:
+    env = {}
+    for item in items:
+        name, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"--env expects NAME=VALUE, got {item!r}")
+        env[name] = value
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark against a fake model server")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 4, 16], help="concurrent clients per level")
+    parser.add_argument('--requests', type=int, default=200, help="requests per level")
+    parser.add_argument('--mix', choices=MIXES, default='uniform')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', default='lognormal:0.5:0.3', help="fake model latency spec")
+    parser.add_argument('--errors', default='', help="fake model errors, e.g. 500=0.02,429=0.01,malformed=0.01")
+    parser.add_argument('--workers', type=int, default=1, help="API worker processes (WEB_CONCURRENCY)")
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help="extra API environment, e.g. --env NEIGHBOR_MAX_DISTANCE=0.15")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help="also write the JSON results to this file")
+    args = parser.parse_args()
+    extra_env = parse_env(args.env)
+
+    workdir = tempfile.mkdtemp(prefix='equanimity-bench-')
+    model_port, api_port = free_port(), free_port()
+    base_url = f"http://127.0.0.1:{api_port}"
+    model_url = f"http://127.0.0.1:{model_port}"
+
+    env = dict(os.environ)
+    # Only the fake model and what is passed with --env; never a real key or .env
+    for name in ('GEMINI_API_KEY', 'PRECOMPUTED_PATH', 'CACHE_PATH', 'MODEL_BACKEND'):
+        env.pop(name, None)
+    env.update({
+        "PYTHONPATH": ROOT,
+        "LOAD_DOTENV": "0",
+        "MODEL_BACKEND": "http",
+        "MODEL_HTTP_URL": f"{model_url}/generate",
+        "HOST": "127.0.0.1",
+        "PORT": str(api_port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "CACHE_PATH": os.path.join(workdir, 'technique_cache.sqlite3'),
+        "PRECOMPUTED_PATH": os.path.join(workdir, 'precomputed_techniques.json.gz'),
+        "RECORDINGS_DIR": os.path.join(workdir, 'recordings')
+    })
+    if args.mix == 'unique':
+        # Distinct profiles only stay uncached without the result cache
+        env["CACHE_BACKEND"] = "none"
+    env.update(extra_env)
+
+    fake_model = subprocess.Popen(
+        [sys.executable, '-m', 'bench.fake_model', '--port', str(model_port), '--latency', args.latency,
+         '--errors', args.errors, '--seed', str(args.seed)],
+        cwd=ROOT, stdout=subprocess.DEVNULL
+    )
+    server = None
+    try:
+        wait_until(f"{model_url}/stats", args.timeout)
+        # serve.py from a scratch directory; LOAD_DOTENV=0 keeps the checkout's .env out
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve.py')], cwd=workdir, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wait_until(f"{base_url}/readyz", args.timeout)
+        memory_idle = worker_memory(server.pid)
+
+        levels = []
+        for concurrency in args.levels:
+            print(f"Running {args.requests} requests with {concurrency} clients...", file=sys.stderr)
+            assessments = workload(args.mix, args.requests, args.seed * 1000 + concurrency)
+            level = run_level(base_url, assessments, concurrency, args.timeout)
+            level["memory"] = worker_memory(server.pid)
+            levels.append(level)
+        fake_model_stats = requests.get(f"{model_url}/stats", timeout=5).json()
+    finally:
+        for process in (server, fake_model):
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    report = {
+        "revision": git_revision(),
+        "config": {
+            "mix": args.mix,
+            "seed": args.seed,
+            "requests_per_level": args.requests,
+            "latency": args.latency,
+            "errors": args.errors,
+            "workers": args.workers,
+            "env": extra_env
+        },
+        "memory_idle": memory_idle,
+        "levels": levels,
+        "fake_model": fake_model_stats
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+
+
+if __name__ == '__main__':
+    main()
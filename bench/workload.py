@@ -0,0 +1,44 @@
+# bench/workload.py - Assessment mixes drawn from the question bank's option ids
+#
+#   uniform - every option equally likely, so the 1,024 profiles repeat
+#             and caches warm up as they would in production
+#   skewed  - options weighted towards the middle of each question, the
+#             way real answers cluster, so a few profiles dominate
+#   unique  - distinct profiles in seeded order (repeating only after all
+#             1,024); bench/run.py turns the result cache off for this mix
+#             so every request reaches the model
+import random
+from typing import Dict, List
+
+from questions import PROFILE_COUNT, QUESTIONS, choices_for_index
+
+MIXES = ('uniform', 'skewed', 'unique')
+
+# Relative weight of each option, most reactive first
+SKEWED_WEIGHTS = (1, 3, 4, 2)
+
+
+def assessment(rng: random.Random, mix: str) -> Dict[str, int]:
+    """One submission of option ids drawn from the uniform or skewed mix"""
+    if mix not in ('uniform', 'skewed'):
+        raise ValueError(f"Mix {mix!r} is not drawn one assessment at a time")
+    answers = {}
+    for question in QUESTIONS:
+        options = range(len(question["options"]))
+        if mix == 'skewed':
+            answers[f"q{question['number']}"] = rng.choices(options, weights=SKEWED_WEIGHTS[:len(options)])[0]
+        else:
+            answers[f"q{question['number']}"] = rng.choice(options)
+    return answers
+
+
+def workload(mix: str, count: int, seed: int) -> List[Dict[str, int]]:
+    """count submissions; the same seed always gives the same list"""
+    if mix not in MIXES:
+        raise ValueError(f"Unknown mix {mix!r}; expected one of {', '.join(MIXES)}")
+    rng = random.Random(seed)
+    if mix == 'unique':
+        profiles = list(range(PROFILE_COUNT))
+        rng.shuffle(profiles)
+        return [choices_for_index(profiles[i % PROFILE_COUNT]) for i in range(count)]
+    return [assessment(rng, mix) for _ in range(count)]
@@ -0,0 +1,221 @@
+# cache.py - Result cache for generated techniques
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def canonical_answers(answers: Dict[str, str]) -> Dict[str, str]:
+    """Normalize answers so equivalent assessments compare equal"""
+    canonical = {}
+    for question_key in sorted(answers):
+        keywords = [kw.strip().lower() for kw in answers[question_key].split(',')]
+        canonical[str(question_key).strip()] = ', '.join(kw for kw in keywords if kw)
+    return canonical
+
+
+def answers_key(answers: Dict[str, str], prompt_version: str, model_name: str) -> str:
+    """Content hash of the canonical answers, prompt version and model name"""
+    payload = json.dumps(
+        {"answers": canonical_answers(answers), "prompt_version": prompt_version, "model": model_name},
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryCache:
+    """In-process LRU cache with TTL and a size cap"""
+
+    backend = "memory"
+    # Whether calls can wait on I/O and belong off the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def touch(self, key: str) -> bool:
+        """
+        Whether key is still cached, counting a hit and refreshing its recency
+        without returning the value. A missing key is not counted, so the
+        lookup that follows records the miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look a key up without counting it in the stats or refreshing its recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return round(self.hits / lookups, 4) if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hit_ratio()
+        }
+
+
+def connect_shared(path: str) -> sqlite3.Connection:
+    """A SQLite connection in WAL mode, safe to share one file between worker processes"""
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteCache(MemoryCache):
+    """
+    On-disk LRU cache backed by SQLite, survives restarts and is shared by
+    worker processes. Calls can wait up to the busy timeout on another
+    worker's commit, so async code runs them in a thread.
+    """
+
+    backend = "sqlite"
+    blocking = True
+    # Recency is recorded at this resolution, so most hits are reads without a commit
+    ACCESS_RESOLUTION_SECONDS = 60
+
+    def __init__(self, path: str, max_entries: int = 2048, ttl_seconds: float = 86400):
+        super().__init__(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.path = path
+        self._conn = connect_shared(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS techniques ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON techniques (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, accessed_at FROM techniques WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM techniques WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            if now - row[2] > self.ACCESS_RESOLUTION_SECONDS:
+                self._conn.execute("UPDATE techniques SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def touch(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, accessed_at FROM techniques WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] < now:
+                return False
+            if now - row[1] > self.ACCESS_RESOLUTION_SECONDS:
+                self._conn.execute("UPDATE techniques SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+            return True
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM techniques WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO techniques (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl_seconds, now)
+            )
+            overflow = len(self) - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM techniques WHERE key IN "
+                    "(SELECT key FROM techniques ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM techniques").fetchone()[0]
+
+
+def create_cache() -> Optional[MemoryCache]:
+    """Build the result cache from environment configuration"""
+    backend = os.getenv('CACHE_BACKEND', 'memory').lower()
+    max_entries = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
+    ttl_seconds = float(os.getenv('CACHE_TTL_SECONDS', '86400'))
+
+    if backend == 'none':
+        return None
+    if backend == 'sqlite':
+        return SQLiteCache(
+            os.getenv('CACHE_PATH', 'technique_cache.sqlite3'),
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds
+        )
+    return MemoryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
@@ -0,0 +1,189 @@
+# composer.py - Local plan engine composed from a tagged practice library
+#
+# Every option in questions.QUESTIONS runs from reactive to equanimous, so its
+# keywords fall into one of four classes. A plan is assembled slot by slot
+# from library fragments tagged with those classes: each slot takes the
+# fragment whose tags best match the class weights of the assessment, with
+# ties going to the earlier fragment. Each day is scored on the questions it
+# works with, so mixed assessments get mixed plans. No model call, no randomness.
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from questions import QUESTIONS
+
+# Keyword classes, in the option order every question uses
+KEYWORD_CLASSES = ('reactive', 'anxious', 'analytical', 'equanimous')
+
+Fragment = Tuple[Tuple[str, ...], str]
+
+# Questions each day's practices respond to: reactions and emotions, then
+# criticism and emotions, then control and attachment
+DAY_QUESTIONS = {"day1": ('1', '3'), "day2": ('2', '3'), "day3": ('4', '5')}
+
+DAY_LIBRARY: Dict[str, Dict[str, List[Fragment]]] = {
+    "day1": {
+        "title": [
+            (('reactive',), "Finding Solid Ground"),
+            (('anxious',), "Settling the Restless Mind"),
+            (('analytical',), "From Thinking to Sensing"),
+            (('equanimous',), "Resting in Stillness"),
+        ],
+        "morning_practice": [
+            (('reactive',), "Sit with both feet on the floor and feel the weight of your body for 10 minutes. Each time the mind races, name one physical sensation and lengthen the exhale."),
+            (('anxious',), "Practice 10 minutes of counted breathing: inhale for four, exhale for six. When a worry appears, silently note 'planning' or 'worrying' and return to the count."),
+            (('analytical',), "Spend 10 minutes scanning the body from head to feet without interpreting what you find. Let sensations be data you do not need to solve."),
+            (('equanimous',), "Sit for 15 minutes in open breath awareness, letting the breath breathe itself. Notice the stillness that is present between breaths."),
+        ],
+        "daily_integration": [
+            (('reactive',), "Before replying to anything that stings, place a hand on your chest and take three slow breaths. Respond only after the third exhale."),
+            (('anxious',), "Whenever you check your phone, first check your feet. Feel the ground for one breath and notice that this moment is manageable."),
+            (('analytical',), "Three times today, pause a task and ask 'What am I feeling in my body right now?' before returning to your plans."),
+            (('equanimous',), "Carry a light background awareness of the breath through conversations, noticing how calm can coexist with engagement."),
+        ],
+        "evening_reflection": [
+            (('reactive',), "Recall one moment today when you felt the surge of reaction. Without judging it, notice where it lived in the body and how it passed."),
+            (('anxious',), "Write down one worry from today and what actually happened. Notice the gap between the story and the events."),
+            (('analytical',), "Reflect on one moment when you felt something before you understood it. Let that be enough without explaining it."),
+            (('equanimous',), "Rest for five minutes recalling the day as a whole, pleasant and unpleasant alike, and notice what stayed unchanged through it."),
+        ],
+    },
+    "day2": {
+        "title": [
+            (('reactive', 'anxious'), "Making Room for Feelings"),
+            (('analytical',), "Softening the Grip of Control"),
+            (('equanimous',), "Meeting Others with Balance"),
+        ],
+        "morning_practice": [
+            (('reactive',), "Practice RAIN for 15 minutes with a recent difficult emotion: Recognize it, Allow it, Investigate it in the body, and Nurture it with kindness."),
+            (('anxious',), "Practice loving-kindness for 15 minutes, starting with yourself: 'May I be safe. May I be at ease.' Return to the phrases whenever fear pulls you forward in time."),
+            (('analytical',), "For 15 minutes, let thoughts arise and label them only as 'thinking', without following their content. Notice how the mind settles when it is not managed."),
+            (('equanimous',), "Practice 15 minutes of equanimity phrases toward others: 'Your happiness and suffering depend on your actions, not my wishes for you.'"),
+        ],
+        "daily_integration": [
+            (('reactive',), "When a strong emotion arises, name it softly ('anger is here') and let it be here for three breaths before you act."),
+            (('anxious',), "When you notice a 'what if', answer it with 'what is': name three things you can see and one thing you can do now."),
+            (('analytical',), "Choose one small situation today and deliberately leave it unplanned. Notice what happens when you respond in the moment."),
+            (('equanimous',), "In a challenging conversation, keep part of your attention on your breath while fully listening to the other person."),
+        ],
+        "evening_reflection": [
+            (('reactive',), "Journal about one emotion you allowed today instead of acting on it. What did it need from you?"),
+            (('anxious',), "Reflect on a moment of criticism or uncertainty today and write one kind sentence to yourself about it."),
+            (('analytical',), "Notice where you tried to control an outcome today, and where letting go would have cost nothing."),
+            (('equanimous',), "Reflect on how your steadiness affected someone else today, and offer them a silent wish of well-being."),
+        ],
+    },
+    "day3": {
+        "title": [
+            (('reactive', 'anxious'), "The Sky and the Weather"),
+            (('analytical',), "Trusting the Flow"),
+            (('equanimous',), "Equanimity in Action"),
+        ],
+        "morning_practice": [
+            (('reactive',), "Sit for 15 minutes imagining your emotions as weather moving across a wide sky. Each time you are swept up, return to being the sky."),
+            (('anxious',), "Practice 15 minutes of open awareness: notice sounds, sensations and thoughts arising and passing, resting in the knowing of them."),
+            (('analytical',), "Sit for 15 minutes without any technique. Whenever you notice yourself doing the meditation, let go of the effort and simply be aware."),
+            (('equanimous',), "Practice 20 minutes of choiceless awareness, letting attention rest wherever experience is most vivid, welcoming it all equally."),
+        ],
+        "daily_integration": [
+            (('reactive',), "Each time you feel pulled by a strong reaction, say inwardly 'this too will pass' and watch it change."),
+            (('anxious',), "Hold your plans lightly today: when something changes, take one breath and say 'this is how it is now'."),
+            (('analytical',), "When an outcome is out of your hands, do your part fully and then consciously release the result."),
+            (('equanimous',), "Treat pleasant and unpleasant events alike as invitations to stay present, noticing the urge to cling or push away."),
+        ],
+        "evening_reflection": [
+            (('reactive',), "Set an intention for the week ahead: to meet one difficult moment each day with a pause."),
+            (('anxious',), "Write down three moments from these three days when you felt steadier than you expected."),
+            (('analytical',), "Reflect on what it felt like to trust rather than manage, and choose one area of life to keep practicing it."),
+            (('equanimous',), "Contemplate how equanimity and compassion support each other, and set an intention to let both guide you."),
+        ],
+    },
+}
+
+PLAN_LIBRARY: Dict[str, List[Fragment]] = {
+    "technique_title": [
+        (('reactive',), "The Path of the Steady Breath"),
+        (('anxious',), "The Practice of Present Ground"),
+        (('analytical',), "The Way of Soft Awareness"),
+        (('equanimous',), "Deepening the Still Center"),
+    ],
+    "description": [
+        (('reactive',), "Your responses show strong waves of reaction when life moves quickly. This practice builds a pause between stimulus and response, first through the body and then through awareness of emotions as passing events."),
+        (('anxious',), "Your responses show a mind that leans toward worry and self-doubt. This practice steadies attention in the present moment and meets uncertainty with kindness rather than rumination."),
+        (('analytical',), "Your responses show a thoughtful, structured approach to difficulty. This practice complements understanding with direct, embodied awareness, so balance does not depend on effort and control."),
+        (('equanimous',), "Your responses show a natural capacity for acceptance and balance. This practice deepens that steadiness into an open, compassionate presence that stays engaged with life."),
+    ],
+    "insight": [
+        (('reactive',), "Feelings are not commands. When you can feel the full force of an emotion without acting on it, you discover a freedom that no circumstance can take away."),
+        (('anxious',), "Worry is the mind trying to live in a future that has not arrived. Equanimity grows each time you return to the only moment where life actually happens."),
+        (('analytical',), "Understanding can describe the river but only surrender lets you swim. Equanimity is not a problem to solve but a way of meeting what is."),
+        (('equanimous',), "True equanimity is not distance from life but intimacy with it: a heart wide enough to hold joy and sorrow without being overturned by either."),
+    ],
+    "zen_quote": [
+        (('reactive',), "Between stimulus and response there is a space. In that space is our power to choose our response. - Viktor Frankl"),
+        (('anxious',), "Do not dwell in the past, do not dream of the future, concentrate the mind on the present moment. - Buddha"),
+        (('analytical',), "Let go, or be dragged. - Zen proverb"),
+        (('equanimous',), "Be like a mountain: unmoved by the winds of praise and blame. - Buddha"),
+    ],
+    "long_term_guidance": [
+        (('reactive',), "Keep a daily practice of at least 10 minutes of grounding breath, and treat every strong reaction as a chance to practice the pause. Over weeks, the gap between feeling and acting will widen on its own."),
+        (('anxious',), "Continue daily loving-kindness and counted breathing, even for five minutes. When worry returns, meet it as a familiar visitor rather than an emergency."),
+        (('analytical',), "Balance your gift for understanding with daily periods of simple, unstructured awareness. Notice where letting go serves you better than managing."),
+        (('equanimous',), "Sustain a daily sitting practice and extend your steadiness into service and relationships. Let equanimity become the ground from which compassion acts."),
+    ],
+}
+
+
+class PlanComposer:
+    """Assemble technique plans from the fragment library by keyword-class scoring"""
+
+    def __init__(self, questions: Sequence[Dict[str, Any]] = QUESTIONS,
+                 plan_library: Dict[str, List[Fragment]] = PLAN_LIBRARY,
+                 day_library: Dict[str, Dict[str, List[Fragment]]] = DAY_LIBRARY):
+        self.plan_library = plan_library
+        self.day_library = day_library
+        # Keyword -> class counts, over every option it appears in
+        self._classes: Dict[str, Dict[str, int]] = {}
+        for question in questions:
+            for index, (_, keywords) in enumerate(question["options"]):
+                for keyword in keywords.split(', '):
+                    counts = self._classes.setdefault(keyword, {})
+                    counts[KEYWORD_CLASSES[index]] = counts.get(KEYWORD_CLASSES[index], 0) + 1
+
+    def class_weights(self, answers: Dict[str, str]) -> Optional[Dict[str, float]]:
+        """Share of the answers' known keywords in each class; None if none are known"""
+        weights = {name: 0.0 for name in KEYWORD_CLASSES}
+        for answer in answers.values():
+            for keyword in answer.split(', '):
+                counts = self._classes.get(keyword)
+                if counts is None:
+                    continue
+                total = sum(counts.values())
+                for name, count in counts.items():
+                    weights[name] += count / total
+        known = sum(weights.values())
+        if not known:
+            return None
+        return {name: weight / known for name, weight in weights.items()}
+
+    @staticmethod
+    def _pick(fragments: List[Fragment], weights: Dict[str, float]) -> str:
+        best: Optional[str] = None
+        best_score = -1.0
+        for tags, text in fragments:
+            score = sum(weights[tag] for tag in tags) / len(tags)
+            if score > best_score:
+                best, best_score = text, score
+        return best
+
+    def compose(self, answers: Dict[str, str]) -> Dict[str, Any]:
+        """A complete technique for canonical answers, in the TechniqueResponse shape"""
+        # Nothing recognized at all: a balanced middle-of-the-road plan
+        balanced = {name: 1 / len(KEYWORD_CLASSES) for name in KEYWORD_CLASSES}
+        weights = self.class_weights(answers) or balanced
+        plan: Dict[str, Any] = {
+            field: self._pick(fragments, weights) for field, fragments in self.plan_library.items()
+        }
+        for day, slots in self.day_library.items():
+            day_answers = {key: answers[key] for key in DAY_QUESTIONS.get(day, ()) if key in answers}
+            day_weights = self.class_weights(day_answers) or weights
+            plan[day] = {slot: self._pick(fragments, day_weights) for slot, fragments in slots.items()}
+        return plan
@@ -0,0 +1,89 @@
+# frontend_bench.py - Server CPU per session of the Streamlit assessment flow
+#
+# Drives app.py headlessly through Streamlit's AppTest: intro, answering all
+# questions and submitting. Reports server CPU and the serialized size of the
+# elements each run sends to the browser. The question bank is served from questions.py and
+# generation is replaced by an instant empty result, so only the frontend's own
+# script reruns are measured.
+import argparse
+import json
+import os
+import random
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from questions import QUESTIONS
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def app_script() -> str:
+    """app.py plus the call to main(), with the backend stubbed out"""
+    with open(os.path.join(ROOT, 'app.py'), encoding='utf-8') as f:
+        source = f.read()
+    return (
+        f"import sys\nsys.path.insert(0, {ROOT!r})\n__file__ = {os.path.join(ROOT, 'app.py')!r}\n"
+        + source
+        + "\n\nfrom questions import question_bank\n\ndef get_question_bank():\n    return question_bank()\n"
+        + "\n\ndef get_technique(answers, bank_version):\n    return None\n\nmain()\n"
+    )
+
+
+def element_bytes(node) -> int:
+    """Serialized size of an element tree as last sent to the browser"""
+    proto = getattr(node, 'proto', None)
+    size = proto.ByteSize() if hasattr(proto, 'ByteSize') else 0
+    for child in getattr(node, 'children', {}).values():
+        size += element_bytes(child)
+    return size
+
+
+def run_session(script: str, rng: random.Random) -> dict:
+    """Complete one assessment; return the CPU time and bytes of each script run"""
+    at = AppTest.from_string(script, default_timeout=30)
+    run_bytes = []
+    started = time.process_time()
+
+    at.run()
+    run_bytes.append(element_bytes(at._tree))
+    at.button[0].click().run()
+    run_bytes.append(element_bytes(at._tree))
+    # Choosing options inside the form happens in the browser; only submit reruns
+    for question in QUESTIONS:
+        at.radio(key=f"question_{question['number']}").set_value(rng.choice(question['options'])[0])
+    at.button[0].click().run()
+    run_bytes.append(element_bytes(at._tree))
+
+    cpu = time.process_time() - started
+    if at.session_state.current_step != 'generating':
+        raise RuntimeError(f"Session ended on step {at.session_state.current_step}")
+    return {"runs": len(run_bytes), "cpu_seconds": cpu, "run_bytes": run_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Streamlit server CPU per assessment session")
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    script = app_script()
+    rng = random.Random(args.seed)
+    results = [run_session(script, rng) for _ in range(args.sessions)]
+
+    cpu = sum(result["cpu_seconds"] for result in results)
+    runs = sum(result["runs"] for result in results)
+    report = {
+        "sessions": args.sessions,
+        "runs_per_session": runs / args.sessions,
+        # Intro, assessment form, submitted; the first run of a session carries the stylesheet
+        "bytes_per_run": results[0]["run_bytes"],
+        "cpu_ms_per_run": round(cpu / runs * 1000, 2),
+        "cpu_ms_per_session": round(cpu / args.sessions * 1000, 2),
+        "sessions_per_cpu_second": round(args.sessions / cpu, 1) if cpu else None
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# jobs.py - Background job queue for technique generation
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """A queued generation and, once finished, its result or error"""
+
+    def __init__(self, payload: Any):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = 'queued'
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.retry_after: Optional[float] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+            "retry_after": self.retry_after,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobQueue:
+    """Bounded queue drained by a fixed pool of worker tasks"""
+
+    def __init__(self, handler: Callable[[Any], Awaitable[Any]], workers: int = 4,
+                 max_queued: int = 100, ttl_seconds: float = 600):
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_seconds: float = 0) -> None:
+        """Stop the workers, first giving queued and running jobs up to drain_seconds to finish"""
+        self._stopping = True
+        if drain_seconds > 0 and self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_seconds)
+            except asyncio.TimeoutError:
+                print(f"Warning: stopping with {self._queue.qsize()} jobs still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, payload: Any) -> Job:
+        self._sweep()
+        if self._queue is None or self._queue.full() or self._stopping:
+            self.rejected += 1
+            raise QueueFullError("Job queue is full")
+        job = Job(payload)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Long-poll: return once the job finishes or the timeout passes"""
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = 'running'
+            try:
+                job.result = await self.handler(job.payload)
+                job.status = 'done'
+                self.completed += 1
+            except Exception as e:
+                job.error = str(getattr(e, 'detail', e))
+                # Admission control refusals say when a resubmitted job can run
+                job.status_code = getattr(e, 'status_code', None)
+                job.retry_after = getattr(e, 'retry_after', None)
+                job.status = 'failed'
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                job.done.set()
+                self._queue.task_done()
+
+    def _sweep(self) -> None:
+        """Forget finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
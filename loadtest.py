@@ -0,0 +1,107 @@
+# loadtest.py - Concurrency load test for the Equanimity API
+#
+# Usage:
+#   python loadtest.py --base-url http://localhost:8000 --levels 1 2 4 8 16
+#
+# For each concurrency level, sends --requests generations for distinct
+# profiles and probes /health while they run. Start the server with
+# CACHE_BACKEND=none and no precomputed file so every generation reaches
+# the model. Throughput should rise with concurrency up to
+# MODEL_CONCURRENCY, and /health should stay fast throughout.
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from questions import PROFILE_COUNT, choices_for_index
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def unique_answers(index):
+    """Option ids of a different profile for each of the first 1,024 requests"""
+    return choices_for_index(index % PROFILE_COUNT)
+
+
+def run_level(base_url, concurrency, total_requests, timeout):
+    session_local = threading.local()
+
+    def session():
+        if not hasattr(session_local, 'session'):
+            session_local.session = requests.Session()
+        return session_local.session
+
+    def one_request(index):
+        started = time.perf_counter()
+        try:
+            response = session().post(
+                f"{base_url}/generate-technique",
+                json={"answers": unique_answers(index)},
+                timeout=timeout
+            )
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    health_latencies = []
+    stop = threading.Event()
+
+    def probe_health():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                requests.get(f"{base_url}/health", timeout=timeout)
+                health_latencies.append(time.perf_counter() - started)
+            except requests.exceptions.RequestException:
+                pass
+            stop.wait(0.2)
+
+    prober = threading.Thread(target=probe_health, daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total_requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+
+    latencies = [latency for ok, latency in results if ok]
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": sum(1 for ok, _ in results if not ok),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_s": round(statistics.median(latencies), 3) if latencies else 0.0,
+        "p95_s": round(percentile(latencies, 95), 3),
+        "health_p95_s": round(percentile(health_latencies, 95), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API throughput at increasing concurrency")
+    parser.add_argument('--base-url', default="http://localhost:8000")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--requests', type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'rps':>8} {'p50 s':>8} {'p95 s':>8} {'health p95 s':>13} {'errors':>7}")
+    for level in args.levels:
+        result = run_level(args.base_url, level, args.requests, args.timeout)
+        print(
+            f"{result['concurrency']:>8} {result['throughput_rps']:>8} {result['p50_s']:>8} "
+            f"{result['p95_s']:>8} {result['health_p95_s']:>13} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,43 @@
 # main.py - FastAPI Backend
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import google.generativeai as genai
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, StrictInt, field_validator
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import os
 from dotenv import load_dotenv
 import json
-from typing import Dict, Any
-import uvicorn
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, List, NamedTuple, Optional, Tuple, Union
 
-# Load environment variables
-load_dotenv()
+# Load environment variables before the modules below read them. load_dotenv
+# finds a .env next to this file whatever the working directory, so runs that
+# must see only their own environment (bench/run.py) set LOAD_DOTENV=0
+if os.getenv('LOAD_DOTENV', '1') == '1':
+    load_dotenv()
+
+from admission import (
+    AdmissionError, OverloadedError, RateLimitedError, create_client_limiter, create_model_quota, is_quota_error
+)
+from backends import create_lazy_backend
+from cache import SQLiteCache, answers_key, canonical_answers, create_cache
+from composer import PlanComposer
+from jobs import JobQueue, QueueFullError
+from metrics import (
+    FALLBACK_RESPONSES, HTTP_RESPONSES, NEIGHBOR_MATCH_DISTANCE, PARSE_ERRORS, PROMPT_TOKENS, REQUESTS_IN_FLIGHT,
+    register_admission_metrics, register_cache_metrics, register_model_guard_metrics, register_prompt_metrics,
+    register_singleflight_metrics
+)
+from neighbors import create_neighbor_index
+from parsing import SectionScanner, parse_technique_fields
+from precompute import DEFAULT_OUTPUT, PrecomputedStore
+from prompts import DEFAULT_PROMPT_VERSION, estimate_tokens, get_prompt
+from questions import QUESTION_BANK_VERSION, PROFILE_COUNT, answers_for_index, expand_answers, question_bank
+from resilience import CircuitOpenError, DeadlineExceededError, create_model_guard, request_budget
+from responses import EncodedBody, create_encoded_cache, encoded_response
+from singleflight import EventFeed, SingleFlight, SQLiteLeases
+from tracing import TRACING_ENABLED, stage, start_trace
 
 app = FastAPI(
     title="Equanimity API",
@@ -27,17 +54,106 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure Gemini AI
+GEMINI_MODEL_NAME = 'gemini-pro'
+# Prompt template; its version is part of every cache key
+PROMPT_VERSION = os.getenv('PROMPT_VERSION', DEFAULT_PROMPT_VERSION)
+prompt_template = get_prompt(PROMPT_VERSION)
+
+# Configure the model backend (Gemini unless MODEL_BACKEND says otherwise). It is
+# built by the warm-up task at startup or on first use, so importing stays fast.
 try:
-    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-    model = genai.GenerativeModel('gemini-pro')
+    model = create_lazy_backend(GEMINI_MODEL_NAME)
 except Exception as e:
-    print(f"Warning: Gemini AI configuration failed: {e}")
+    print(f"Warning: model backend configuration failed: {e}")
     model = None
 
+# Cache keys include the backend's model, so stub output never mixes with Gemini's
+MODEL_NAME = model.model_name if model is not None else GEMINI_MODEL_NAME
+
+def model_available() -> bool:
+    """Whether generation should call the model: configured, and not known to be failing to build"""
+    return model is not None and model.error is None
+
+register_prompt_metrics(prompt_template, estimate_tokens)
+
+# Model calls are blocking, so they run on a dedicated bounded thread pool
+# instead of the event loop. MODEL_CONCURRENCY caps simultaneous generations.
+MODEL_CONCURRENCY = int(os.getenv('MODEL_CONCURRENCY', '8'))
+model_executor = ThreadPoolExecutor(max_workers=MODEL_CONCURRENCY, thread_name_prefix='model')
+
+# Admission control: model calls paced to the provider quota (MODEL_QUOTA_RPM)
+# with a bounded wait queue, and a request rate limit per client
+model_quota = create_model_quota()
+client_limiter = create_client_limiter()
+register_admission_metrics(model_quota, client_limiter)
+# Header identifying the client for rate limiting, e.g. X-Client-Id when every
+# request arrives through the frontend; the client address otherwise
+CLIENT_ID_HEADER = os.getenv('CLIENT_ID_HEADER', '')
+# Retry-After sent when the provider itself refuses a call for quota
+PROVIDER_QUOTA_RETRY_SECONDS = 10
+
+# Per-request latency budget, hedging and circuit breaker around those calls
+model_guard = create_model_guard(model_executor, admit_hedge=model_quota.try_acquire)
+register_model_guard_metrics(model_guard)
+
+# Batch endpoint limits: unique generations run at once, and items per request
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '1000'))
+
+# Follow-up calls allowed to regenerate fields missing from a partial response
+REPAIR_ATTEMPTS = int(os.getenv('REPAIR_ATTEMPTS', '1'))
+
+# Result cache for repeat assessment profiles
+technique_cache = create_cache()
+if technique_cache is not None:
+    register_cache_metrics(technique_cache)
+
+# In-flight generations, keyed like the cache. With the SQLite cache, worker
+# processes also coordinate through leases in the same database file.
+inflight = SingleFlight(
+    SQLiteLeases(technique_cache.path, ttl_seconds=model_guard.default_budget + 5)
+    if isinstance(technique_cache, SQLiteCache) else None
+)
+register_singleflight_metrics(inflight)
+
+# Techniques generated offline by precompute.py for the full profile space
+precomputed = PrecomputedStore.load(os.getenv('PRECOMPUTED_PATH', DEFAULT_OUTPUT), PROMPT_VERSION, MODEL_NAME)
+
+# Generated techniques served to nearby assessment profiles (NEIGHBOR_MAX_DISTANCE)
+neighbor_index = create_neighbor_index()
+if neighbor_index is not None and precomputed is not None:
+    for profile, technique_data in enumerate(precomputed.techniques):
+        if technique_data is not None:
+            neighbor_index.add(answers_for_index(profile), technique_data)
+
+# Serialized and compressed bodies of techniques that will be served unchanged again
+encoded_cache = create_encoded_cache()
+
+# The question bank, encoded once; its ETag changes only with QUESTION_BANK_VERSION
+encoded_questions = EncodedBody(question_bank())
+
 # Pydantic models
 class AssessmentAnswers(BaseModel):
-    answers: Dict[str, str]
+    # Option ids per question id ({"q1": 2}), expanded to canonical keyword answers
+    answers: Dict[str, Union[StrictInt, str]]
+    # Version of the question bank the option ids refer to, from GET /questions
+    question_bank: Optional[str] = None
+
+    @field_validator('answers')
+    @classmethod
+    def expand_option_ids(cls, answers: Dict[str, Union[int, str]]) -> Dict[str, str]:
+        return expand_answers(answers)
+
+    @field_validator('question_bank')
+    @classmethod
+    def current_question_bank(cls, version: Optional[str]) -> Optional[str]:
+        if version is not None and version != QUESTION_BANK_VERSION:
+            raise ValueError(f"Question bank {version} is out of date; fetch GET /questions for {QUESTION_BANK_VERSION}")
+        return version
+
+class BatchAssessments(BaseModel):
+    assessments: List[AssessmentAnswers]
+    parallelism: Optional[int] = None
 
 class TechniqueResponse(BaseModel):
     technique_title: str
@@ -49,153 +165,744 @@ class TechniqueResponse(BaseModel):
     zen_quote: str
     long_term_guidance: str
 
+# Fallback plan returned when the model output cannot be parsed
+FALLBACK_TECHNIQUE = TechniqueResponse(
+    technique_title="The Path of Present Awareness",
+    description="Based on your responses, you would benefit from a practice that cultivates moment-to-moment awareness and emotional balance. This gentle yet powerful approach will help you develop equanimity through mindful presence.",
+    insight="True equanimity arises not from avoiding life's challenges, but from meeting them with an open, spacious heart that remains unchanged by changing circumstances.",
+    day1={
+        "title": "Grounding Practice",
+        "morning_practice": "Begin with 10 minutes of breath awareness. Sit comfortably, close your eyes, and simply observe your natural breathing. When thoughts arise, gently return to the breath without judgment.",
+        "daily_integration": "Throughout the day, take three conscious breaths before responding to any challenging situation. This creates space between stimulus and response.",
+        "evening_reflection": "Before sleep, reflect on one moment when you remained calm during difficulty, appreciating your natural capacity for peace."
+    },
+    day2={
+        "title": "Expanding Awareness",
+        "morning_practice": "Practice loving-kindness meditation for 15 minutes. Begin with yourself, then extend compassion to loved ones, neutral people, difficult people, and all beings.",
+        "daily_integration": "When facing criticism or conflict, silently wish the other person well while maintaining your center. Notice how this changes your internal experience.",
+        "evening_reflection": "Journal about how extending compassion affected your sense of inner stability and connection."
+    },
+    day3={
+        "title": "Embodied Wisdom",
+        "morning_practice": "Sit in open awareness for 15 minutes. Rest in spacious consciousness, aware of thoughts and feelings arising and passing without attachment.",
+        "daily_integration": "Practice seeing all experiences as temporary weather patterns in the sky of awareness. You are the sky, not the weather.",
+        "evening_reflection": "Set an intention to continue cultivating equanimity, knowing that each moment offers a fresh opportunity to practice."
+    },
+    zen_quote="Peace comes from within. Do not seek it without. - Buddha",
+    long_term_guidance="Continue daily meditation practice, even if just 5-10 minutes. Remember that equanimity is not a destination but a way of traveling through life with grace and wisdom."
+)
+
+# Plans composed locally from a fragment library: served for mode=local and,
+# with DEGRADED_MODE=local (default), instead of the static fallback and of model errors
+composer = PlanComposer()
+DEGRADED_MODE = os.getenv('DEGRADED_MODE', 'local')
+
+# Query parameter choosing between model generation and the local plan engine
+GENERATION_MODES = '^(model|local)$'
+
+REQUIRED_FIELDS = ['technique_title', 'description', 'insight', 'day1', 'day2', 'day3', 'zen_quote', 'long_term_guidance']
+
+@stage('prompt_build')
+def build_prompt(answers: Dict[str, str]) -> str:
+    """Build the model prompt from canonical assessment answers"""
+    # Extract keywords from all answers
+    all_keywords = []
+    for answer_keywords in answers.values():
+        all_keywords.extend(answer_keywords.split(', '))
+
+    prompt = prompt_template.render(all_keywords)
+    PROMPT_TOKENS.labels(version=PROMPT_VERSION).inc(estimate_tokens(prompt))
+    return prompt
+
+@stage('local_compose')
+def local_technique(answers: Dict[str, str]) -> TechniqueResponse:
+    """Compose a plan for canonical answers from the local fragment library"""
+    return TechniqueResponse(**composer.compose(answers))
+
+def degraded_technique(answers: Dict[str, str]) -> TechniqueResponse:
+    """The plan served when the model cannot provide one"""
+    FALLBACK_RESPONSES.inc()
+    if DEGRADED_MODE == 'local':
+        return local_technique(answers)
+    return FALLBACK_TECHNIQUE
+
+async def call_model(prompt: str) -> str:
+    """Run the blocking model call on the model executor, within the request's budget and quota"""
+    with stage('admission'):
+        await model_quota.acquire()
+    with stage('model_call'):
+        return await model_guard.call(model.generate, prompt)
+
+def build_repair_prompt(answers: Dict[str, str], fields: Dict[str, Any], missing: List[str]) -> str:
+    """Ask the model for only the fields missing from a partial technique"""
+    return build_prompt(answers) + f"""
+A previous answer to this request was incomplete. These fields were already written:
+
+{json.dumps(fields, indent=2)}
+
+Respond with a JSON object containing ONLY the following missing fields, in the format above and consistent with the fields already written: {', '.join(missing)}
+"""
+
+async def complete_technique(answers: Dict[str, str], text: str) -> Optional[TechniqueResponse]:
+    """Parse model output, regenerating only the fields that are missing or invalid"""
+    with stage('parse'):
+        fields, missing = parse_technique_fields(text, TechniqueResponse)
+    if missing:
+        PARSE_ERRORS.inc()
+
+    for _ in range(REPAIR_ATTEMPTS):
+        if not missing:
+            break
+        print(f"Regenerating missing fields: {', '.join(missing)}")
+        try:
+            repair_text = await call_model(build_repair_prompt(answers, fields, missing))
+        except Exception as e:
+            print(f"Repair generation failed: {e}")
+            break
+        with stage('parse'):
+            repaired, _ = parse_technique_fields(repair_text, TechniqueResponse)
+        fields.update({name: repaired[name] for name in missing if name in repaired})
+        missing = [name for name in missing if name not in fields]
+
+    if missing:
+        print(f"JSON parsing error: missing required fields {', '.join(missing)}")
+        print(f"Raw response: {text}")
+        return None
+    with stage('validation'):
+        return TechniqueResponse(**fields)
+
+async def stream_model(prompt: str) -> AsyncIterator[str]:
+    """
+    Stream model output chunks, iterating the blocking stream on the model executor.
+    Streams are not hedged, but count against the breaker and the request's budget.
+    """
+    if not model_guard.breaker.allow():
+        raise CircuitOpenError("Model circuit breaker is open")
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def produce():
+        try:
+            for chunk in model.generate_stream(prompt):
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    loop.run_in_executor(model_executor, produce)
+    started = loop.time()
+    try:
+        with stage('model_stream'):
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=max(0, model_guard.remaining()))
+                except asyncio.TimeoutError:
+                    model_guard.deadline_exceeded += 1
+                    raise DeadlineExceededError("Model stream did not finish within the request budget")
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    except Exception:
+        model_guard.breaker.record(False, loop.time() - started)
+        raise
+    except BaseException:
+        # The client went away mid-stream: no verdict on the model
+        model_guard.breaker.abandon()
+        raise
+    model_guard.breaker.record(True, loop.time() - started)
+
+async def stream_sections(answers: Dict[str, str], feed: EventFeed) -> str:
+    """Stream the model's answer, publishing each completed section to feed; returns the full text"""
+    with stage('admission'):
+        await model_quota.acquire()
+    feed.begin()
+    scanner = SectionScanner()
+    async for chunk in stream_model(build_prompt(answers)):
+        for field, value in scanner.feed(chunk):
+            if field in REQUIRED_FIELDS:
+                feed.publish((field, value))
+    return scanner.buffer
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def cache_call(fn, *args):
+    """Call a result cache method, in a thread when the cache can block on I/O"""
+    if technique_cache.blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+async def remember_technique(answers: Dict[str, str], cache_key: str, technique: TechniqueResponse) -> None:
+    """Make a newly generated technique available to later identical and nearby assessments"""
+    technique_data = technique.model_dump()
+    if technique_cache is not None:
+        await cache_call(technique_cache.set, cache_key, technique_data)
+        encoded_cache.discard(cache_key)
+    if neighbor_index is not None:
+        neighbor_index.add(answers, technique_data)
+
+def find_neighbor(answers: Dict[str, str]) -> Optional[Tuple[Dict[str, Any], float]]:
+    """A stored technique for a profile within NEIGHBOR_MAX_DISTANCE, and its distance"""
+    if neighbor_index is None:
+        return None
+    with stage('neighbor_lookup'):
+        match = neighbor_index.nearest(answers)
+    if match is not None:
+        NEIGHBOR_MATCH_DISTANCE.observe(match[1])
+    return match
+
+class Resolved(NamedTuple):
+    """A JSON-ready technique, where it came from and, for a nearby profile, its distance"""
+    technique: Dict[str, Any]
+    source: str
+    match_distance: Optional[float] = None
+
+# Sources that serve the same technique for the same key until it expires, so
+# their responses can be encoded once
+ENCODABLE_SOURCES = ('local', 'precomputed', 'cache')
+
+def encodable(resolved: Resolved) -> bool:
+    """Whether the same key will be served this same technique again"""
+    # A fresh generation is what the cache now holds for its key
+    return resolved.source in ENCODABLE_SOURCES or (resolved.source == 'model' and technique_cache is not None)
+
+def degraded(answers: Dict[str, str]) -> Resolved:
+    return Resolved(degraded_technique(answers).model_dump(), 'degraded')
+
+async def generate_fresh(answers: Dict[str, str], cache_key: str, feed: Optional[EventFeed] = None) -> Resolved:
+    """
+    Generate a technique with the model and cache it if it parses. With a feed,
+    the answer is streamed and each section is published as soon as it is complete.
+    """
+    if not model_available():
+        if DEGRADED_MODE == 'local':
+            return degraded(answers)
+        raise HTTPException(
+            status_code=500, 
+            detail="AI model not configured. Please check the GEMINI_API_KEY and MODEL_BACKEND environment variables."
+        )
+
+    try:
+        # Generate response from the model backend
+        if feed is None:
+            response_text = await call_model(build_prompt(answers))
+        else:
+            response_text = await stream_sections(answers, feed)
+        
+        # Parse the JSON response, regenerating only what is missing
+        technique = await complete_technique(answers, response_text)
+        if technique is None:
+            # Return a fallback response
+            return degraded(answers)
+
+        await remember_technique(answers, cache_key, technique)
+        return Resolved(technique.model_dump(), 'model')
+        
+    except AdmissionError:
+        raise
+    except Exception as e:
+        print(f"API Error: {e}")
+        if is_quota_error(e):
+            model_quota.exhausted()
+        if DEGRADED_MODE == 'local':
+            return degraded(answers)
+        if is_quota_error(e):
+            raise OverloadedError("The model quota is used up right now. Please try again shortly.",
+                                  retry_after=PROVIDER_QUOTA_RETRY_SECONDS)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate technique: {str(e)}"
+        )
+
+def stored_technique(cache_key: str) -> Optional[Resolved]:
+    """A technique another worker has finished generating, if any (blocking; SingleFlight runs it in a thread)"""
+    stored = technique_cache.peek(cache_key) if technique_cache is not None else None
+    return Resolved(stored, 'cache') if stored is not None else None
+
+def response_key(answers: Dict[str, str], mode: str) -> str:
+    """Key of the encoded response for canonical answers in a generation mode"""
+    if mode == 'local':
+        return answers_key(answers, 'local', 'composer')
+    return answers_key(answers, PROMPT_VERSION, MODEL_NAME)
+
+async def resolve_technique(raw_answers: Dict[str, str], mode: str = 'model') -> Resolved:
+    """
+    Serve a technique from the precomputed store, cache or a nearby profile,
+    generating it if needed. mode='local' composes the plan locally instead.
+    """
+    answers = canonical_answers(raw_answers)
+    if mode == 'local':
+        with stage('local_compose'):
+            return Resolved(composer.compose(answers), 'local')
+    if precomputed is not None:
+        technique_data = precomputed.get(answers)
+        if technique_data is not None:
+            return Resolved(technique_data, 'precomputed')
+
+    cache_key = answers_key(answers, PROMPT_VERSION, MODEL_NAME)
+    if technique_cache is not None:
+        cached = await cache_call(technique_cache.get, cache_key)
+        if cached is not None:
+            return Resolved(cached, 'cache')
+
+    match = find_neighbor(answers)
+    if match is not None:
+        technique_data, distance = match
+        return Resolved(technique_data, 'neighbor', distance)
+
+    # While the breaker is open the model is skipped entirely
+    if model_guard.breaker.is_open:
+        return degraded(answers)
+
+    # Identical assessments already being generated share that generation,
+    # within the budget of the request that started it
+    with request_budget(model_guard.default_budget):
+        return await inflight.do(
+            cache_key,
+            lambda: generate_fresh(answers, cache_key),
+            lookup=lambda: stored_technique(cache_key)
+        )
+
+async def technique_response(request: Request, raw_answers: Dict[str, str], mode: str) -> Response:
+    """
+    Resolve a technique and serve it. Techniques that will be served unchanged
+    again are serialized and compressed once and then sent as stored bytes.
+    """
+    answers = canonical_answers(raw_answers)
+    key = response_key(answers, mode)
+    with stage('encoded_lookup'):
+        encoded = encoded_cache.get(key)
+        # Bytes of a cached plan live only as long as the result cache keeps the
+        # plan (TTL and size cap), and serving them counts as a result cache hit
+        if encoded is not None and encoded.source == 'cache' and not await cache_call(technique_cache.touch, key):
+            encoded_cache.discard(key)
+            encoded = None
+    if encoded is not None:
+        return encoded_response(request, encoded)
+
+    resolved = await resolve_technique(answers, mode)
+    if not encodable(resolved):
+        headers = {"X-Technique-Source": resolved.source}
+        if resolved.match_distance is not None:
+            headers["X-Match-Distance"] = f"{resolved.match_distance:.4f}"
+        return JSONResponse(resolved.technique, headers=headers)
+    # Later hits on a fresh generation are served from what the cache stored
+    source = 'cache' if resolved.source == 'model' else resolved.source
+    with stage('encode'):
+        encoded = encoded_cache.put(key, resolved.technique, source)
+    return encoded_response(request, encoded, {"X-Technique-Source": resolved.source})
+
+async def run_job(answers: Dict[str, str]) -> Dict[str, Any]:
+    """Job queue handler: resolve one assessment to a JSON-ready technique"""
+    return (await resolve_technique(answers)).technique
+
+# Background workers for the job API, sized separately from HTTP handlers
+job_queue = JobQueue(
+    run_job,
+    workers=int(os.getenv('JOB_WORKERS', '4')),
+    max_queued=int(os.getenv('JOB_QUEUE_SIZE', '100')),
+    ttl_seconds=float(os.getenv('JOB_TTL_SECONDS', '600'))
+)
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+
+# Seconds between attempts to build the model backend after a failure, and
+# whether warm-up also makes one cheap call to check the backend answers. On by
+# default for Gemini, where a client builds fine with a revoked key or no network.
+MODEL_INIT_RETRY_SECONDS = float(os.getenv('MODEL_INIT_RETRY_SECONDS', '10'))
+REMOTE_BACKENDS = ('gemini', 'record')
+MODEL_WARMUP_PROBE = os.getenv(
+    'MODEL_WARMUP_PROBE', '1' if model is not None and model.name in REMOTE_BACKENDS else '0'
+) == '1'
+model_warmed_up = False
+
+def readiness() -> str:
+    """`ready`, `degraded` (local plans only), `starting` or `unavailable`"""
+    # Built is not enough while the warm-up probe has yet to answer
+    if model is not None and model.ready and model.error is None and model_warmed_up:
+        return "ready"
+    if not model_warmed_up:
+        return "starting"
+    return "degraded" if DEGRADED_MODE == 'local' else "unavailable"
+
+async def warm_up_model():
+    """Build the model backend off the event loop, retrying until it succeeds"""
+    global model_warmed_up
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            backend = await loop.run_in_executor(model_executor, model.load)
+            if MODEL_WARMUP_PROBE:
+                # A probe that hangs (e.g. no route to the provider) fails like any other
+                try:
+                    await asyncio.wait_for(loop.run_in_executor(model_executor, backend.count_tokens, "warm-up"),
+                                           timeout=model_guard.default_budget)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"warm-up probe got no answer within {model_guard.default_budget}s")
+            model.error = None
+            print(f"Model backend {model.name} ready after {model.init_seconds}s")
+            return
+        except Exception as e:
+            model.error = str(e)
+            print(f"Warning: model backend warm-up failed, retrying in {MODEL_INIT_RETRY_SECONDS}s: {e}")
+        finally:
+            model_warmed_up = True
+        await asyncio.sleep(MODEL_INIT_RETRY_SECONDS)
+
+warm_up_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_model_warm_up():
+    global warm_up_task, model_warmed_up
+    if model is None:
+        model_warmed_up = True
+        return
+    warm_up_task = asyncio.create_task(warm_up_model())
+
+# Seconds queued jobs get to finish when the server shuts down
+JOB_DRAIN_SECONDS = float(os.getenv('JOB_DRAIN_SECONDS', '20'))
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_queue.stop(drain_seconds=JOB_DRAIN_SECONDS)
+
+@app.on_event("shutdown")
+def shutdown_model_executor():
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    model_executor.shutdown(wait=False, cancel_futures=True)
+
+@app.exception_handler(AdmissionError)
+async def admission_error(request: Request, error: AdmissionError):
+    """Turned-away requests fail fast with a hint of when to come back"""
+    return JSONResponse(
+        {"detail": error.detail},
+        status_code=error.status_code,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def client_id(request: Request) -> str:
+    """The client a request is rate limited as"""
+    client = request.headers.get(CLIENT_ID_HEADER) if CLIENT_ID_HEADER else None
+    return client or (request.client.host if request.client else "unknown")
+
+def admit_client(request: Request) -> None:
+    """Count a generation request against its client's rate limit"""
+    client_limiter.check(client_id(request))
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    REQUESTS_IN_FLIGHT.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_RESPONSES.labels(path=route.path if route else "unmatched", status=str(status)).inc()
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if not TRACING_ENABLED:
+        return await call_next(request)
+    with start_trace(f"{request.method} {request.url.path}", path=request.url.path) as trace:
+        response = await call_next(request)
+    # Streamed bodies finish after the headers are sent, so their later
+    # stages reach the trace file but not this header
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers["X-Trace-Id"] = trace.trace_id
+    return response
+
 @app.get("/")
 async def root():
     return {"message": "Equanimity API is running", "status": "healthy"}
 
+@app.get("/livez")
+async def liveness():
+    """The process is up and its event loop answers; restart it only if this fails"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """200 once the model backend is built (or local plans can stand in for it), else 503"""
+    status = readiness()
+    return JSONResponse(
+        {"status": status, "model_error": model.error if model is not None else "not configured"},
+        status_code=200 if status in ('ready', 'degraded') else 503
+    )
+
+@app.get("/questions")
+async def get_questions(request: Request):
+    """
+    The assessment questions and their option ids, under a version that
+    submissions may echo back. Send the ETag in If-None-Match to get 304 Not Modified.
+    """
+    return encoded_response(request, encoded_questions, {"Cache-Control": "no-cache"})
+
 @app.get("/health")
 async def health_check():
+    status = readiness()
     return {
-        "status": "healthy",
-        "gemini_configured": model is not None,
-        "api_version": "1.0.0"
+        "status": "healthy" if status == 'ready' else status,
+        "gemini_configured": model is not None and model.name in ('gemini', 'record'),
+        "model_backend": model.name if model is not None else None,
+        "model_name": MODEL_NAME,
+        "model_ready": model is not None and model.ready,
+        "model_init_seconds": model.init_seconds if model is not None else None,
+        "model_error": model.error if model is not None else "not configured",
+        "prompt_version": PROMPT_VERSION,
+        "question_bank": QUESTION_BANK_VERSION,
+        "api_version": "1.0.0",
+        "model_concurrency": MODEL_CONCURRENCY,
+        "cache": await cache_call(technique_cache.stats) if technique_cache is not None else None,
+        "precomputed_profiles": len(precomputed) if precomputed is not None else 0,
+        "singleflight": inflight.stats(),
+        "neighbors": neighbor_index.stats() if neighbor_index is not None else None,
+        "encoded_responses": encoded_cache.stats(),
+        "model_guard": model_guard.stats(),
+        "admission": {"model_quota": model_quota.stats(), "clients": client_limiter.stats()},
+        "jobs": job_queue.stats()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/generate-technique", response_model=TechniqueResponse)
-async def generate_technique(assessment: AssessmentAnswers):
+async def generate_technique(assessment: AssessmentAnswers, request: Request,
+                             mode: str = Query('model', pattern=GENERATION_MODES)):
+    """
+    Generate a personalized 3-day equanimity practice based on assessment answers,
+    given as option ids from GET /questions ({"q1": 2, ...}).
+    X-Technique-Source says where the plan came from (precomputed, cache, neighbor,
+    local, model or degraded); a plan borrowed from a nearby profile carries its
+    distance in X-Match-Distance. mode=local composes the plan without calling the model.
+    """
+    admit_client(request)
+    return await technique_response(request, assessment.answers, mode)
+
+@app.get("/techniques/{profile}", response_model=TechniqueResponse)
+async def get_technique_for_profile(profile: int, request: Request,
+                                    mode: str = Query('model', pattern=GENERATION_MODES)):
+    """
+    The practice for one assessment profile (see questions.profile_index).
+    Cacheable: send the ETag back in If-None-Match to get 304 Not Modified.
+    """
+    if not 0 <= profile < PROFILE_COUNT:
+        raise HTTPException(status_code=404, detail=f"Profile must be between 0 and {PROFILE_COUNT - 1}")
+    admit_client(request)
+    return await technique_response(request, answers_for_index(profile), mode)
+
+@app.post("/generate-techniques/batch")
+async def generate_techniques_batch(batch: BatchAssessments, request: Request,
+                                    mode: str = Query('model', pattern=GENERATION_MODES)):
     """
-    Generate a personalized 3-day equanimity practice based on assessment answers
+    Generate practices for many assessments, streamed back as NDJSON in input order.
+    Identical answer sets are generated once; each line carries either a
+    `technique` or an `error` for that item.
     """
-    if not model:
+    if len(batch.assessments) > BATCH_MAX_ITEMS:
         raise HTTPException(
-            status_code=500, 
-            detail="AI model not configured. Please check GEMINI_API_KEY environment variable."
+            status_code=413,
+            detail=f"Batch too large: at most {BATCH_MAX_ITEMS} assessments per request"
         )
-    
-    try:
-        # Extract keywords from all answers
-        all_keywords = []
-        for answer_keywords in assessment.answers.values():
-            all_keywords.extend(answer_keywords.split(', '))
-        
-        # Create detailed prompt for Gemini
-        prompt = f"""
-You are a renowned Buddhist meditation teacher and mindfulness coach with deep expertise in equanimity practices. Based on this psychological profile from a 5-question assessment, create a transformative 3-day equanimity practice.
-
-ASSESSMENT KEYWORDS: {', '.join(all_keywords)}
-
-The user's responses reveal their current patterns with:
-1. Stress response and challenge management
-2. Reception of criticism and feedback
-3. Emotional regulation and awareness
-4. Control, surrender, and acceptance
-5. Relationship with pleasure/pain, success/failure
-
-Create a response in this EXACT JSON format (no additional text):
-
-{{
-    "technique_title": "A poetic, inspiring name for the practice (4-8 words)",
-    "description": "2-3 sentences explaining why this practice perfectly suits their current state and how it will cultivate deep equanimity",
-    "insight": "One profound, personally relevant insight about equanimity that speaks directly to their patterns",
-    "day1": {{
-        "title": "Foundation theme (2-3 words like 'Grounding Awareness')",
-        "morning_practice": "Detailed 10-15 minute morning practice with step-by-step instructions",
-        "daily_integration": "Specific techniques to apply throughout the day, with concrete examples",
-        "evening_reflection": "5-10 minute evening practice with clear guidance"
-    }},
-    "day2": {{
-        "title": "Deepening theme (2-3 words like 'Expanding Presence')", 
-        "morning_practice": "Building on day 1, slightly more advanced morning practice",
-        "daily_integration": "Deeper integration techniques for real-life challenges",
-        "evening_reflection": "More sophisticated evening practice for integration"
-    }},
-    "day3": {{
-        "title": "Integration theme (2-3 words like 'Embodied Wisdom')",
-        "morning_practice": "Most refined version connecting to their natural equanimity",
-        "daily_integration": "How to make equanimity a permanent life orientation",
-        "evening_reflection": "Celebration practice and commitment to ongoing development"
-    }},
-    "zen_quote": "A relevant, inspiring quote from Buddhist tradition that resonates with their specific journey",
-    "long_term_guidance": "Practical advice for maintaining and deepening this practice beyond 3 days, tailored to their patterns"
-}}
-
-Requirements:
-- Make it deeply personal and transformative
-- Use practical, actionable techniques they can actually implement
-- Draw from Vipassana, Zen, Tibetan Buddhism while staying accessible
-- Address their specific emotional/mental patterns revealed in keywords
-- Build progressively over 3 days toward lasting transformation
-- Include specific meditation techniques, breathing practices, mindfulness exercises
-- Provide concrete examples of how to apply teachings in daily situations
-
-Focus on creating genuine wisdom that leads to freedom from reactivity and the development of unshakeable inner peace.
-"""
+    parallelism = max(1, min(batch.parallelism or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+    semaphore = asyncio.Semaphore(parallelism)
 
-        # Generate response from Gemini
-        response = model.generate_content(prompt)
-        
-        # Parse the JSON response
+    # Deduplicate on the canonical key, remembering where each key is last needed
+    keys = []
+    unique: Dict[str, Dict[str, str]] = {}
+    last_use: Dict[str, int] = {}
+    for index, assessment in enumerate(batch.assessments):
+        key = answers_key(canonical_answers(assessment.answers), PROMPT_VERSION, MODEL_NAME)
+        keys.append(key)
+        unique.setdefault(key, assessment.answers)
+        last_use[key] = index
+
+    # Each distinct assessment counts against the client's rate limit like a
+    # request of its own. A batch refused outright gets 429; one that runs out
+    # part way gets the limiter's error on the lines it could not admit.
+    client = client_id(request)
+    limited: Optional[RateLimitedError] = None
+    admitted = []
+    for key in unique:
         try:
-            # Clean the response text (remove markdown formatting if present)
-            clean_response = response.text.strip()
-            if clean_response.startswith('```json'):
-                clean_response = clean_response[7:]
-            if clean_response.endswith('```'):
-                clean_response = clean_response[:-3]
-            clean_response = clean_response.strip()
-            
-            technique_data = json.loads(clean_response)
-            
-            # Validate the response structure
-            required_fields = ['technique_title', 'description', 'insight', 'day1', 'day2', 'day3', 'zen_quote', 'long_term_guidance']
-            for field in required_fields:
-                if field not in technique_data:
-                    raise ValueError(f"Missing required field: {field}")
-            
-            return TechniqueResponse(**technique_data)
-            
-        except (json.JSONDecodeError, ValueError) as parse_error:
-            print(f"JSON parsing error: {parse_error}")
-            print(f"Raw response: {response.text}")
-            
-            # Return a fallback response
-            return TechniqueResponse(
-                technique_title="The Path of Present Awareness",
-                description="Based on your responses, you would benefit from a practice that cultivates moment-to-moment awareness and emotional balance. This gentle yet powerful approach will help you develop equanimity through mindful presence.",
-                insight="True equanimity arises not from avoiding life's challenges, but from meeting them with an open, spacious heart that remains unchanged by changing circumstances.",
-                day1={
-                    "title": "Grounding Practice",
-                    "morning_practice": "Begin with 10 minutes of breath awareness. Sit comfortably, close your eyes, and simply observe your natural breathing. When thoughts arise, gently return to the breath without judgment.",
-                    "daily_integration": "Throughout the day, take three conscious breaths before responding to any challenging situation. This creates space between stimulus and response.",
-                    "evening_reflection": "Before sleep, reflect on one moment when you remained calm during difficulty, appreciating your natural capacity for peace."
-                },
-                day2={
-                    "title": "Expanding Awareness",
-                    "morning_practice": "Practice loving-kindness meditation for 15 minutes. Begin with yourself, then extend compassion to loved ones, neutral people, difficult people, and all beings.",
-                    "daily_integration": "When facing criticism or conflict, silently wish the other person well while maintaining your center. Notice how this changes your internal experience.",
-                    "evening_reflection": "Journal about how extending compassion affected your sense of inner stability and connection."
-                },
-                day3={
-                    "title": "Embodied Wisdom",
-                    "morning_practice": "Sit in open awareness for 15 minutes. Rest in spacious consciousness, aware of thoughts and feelings arising and passing without attachment.",
-                    "daily_integration": "Practice seeing all experiences as temporary weather patterns in the sky of awareness. You are the sky, not the weather.",
-                    "evening_reflection": "Set an intention to continue cultivating equanimity, knowing that each moment offers a fresh opportunity to practice."
-                },
-                zen_quote="Peace comes from within. Do not seek it without. - Buddha",
-                long_term_guidance="Continue daily meditation practice, even if just 5-10 minutes. Remember that equanimity is not a destination but a way of traveling through life with grace and wisdom."
-            )
-            
-    except Exception as e:
-        print(f"API Error: {e}")
+            client_limiter.check(client)
+        except RateLimitedError as e:
+            if not admitted:
+                raise
+            limited = e
+            break
+        admitted.append(key)
+
+    async def resolve_limited(answers: Dict[str, str]) -> Resolved:
+        async with semaphore:
+            return await resolve_technique(answers, mode)
+
+    async def lines():
+        tasks = {key: asyncio.create_task(resolve_limited(unique[key])) for key in admitted}
+        try:
+            for index, key in enumerate(keys):
+                if key not in tasks:
+                    yield json.dumps({"index": index, "error": limited.detail, "retry_after": limited.retry_after}) + "\n"
+                    continue
+                try:
+                    resolved = await tasks[key]
+                    line = {"index": index, "technique": resolved.technique}
+                    if resolved.match_distance is not None:
+                        line["match_distance"] = resolved.match_distance
+                except AdmissionError as e:
+                    line = {"index": index, "error": e.detail, "retry_after": e.retry_after}
+                except Exception as e:
+                    line = {"index": index, "error": str(getattr(e, 'detail', e))}
+                if last_use[key] == index:
+                    # Drop finished results so large batches do not accumulate
+                    del tasks[key]
+                yield json.dumps(line) + "\n"
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+async def create_job(assessment: AssessmentAnswers, request: Request):
+    """
+    Queue a technique generation and return its job id immediately
+    """
+    admit_client(request)
+    try:
+        job = job_queue.submit(assessment.answers)
+    except QueueFullError:
         raise HTTPException(
-            status_code=500,
-            detail=f"Failed to generate technique: {str(e)}"
+            status_code=503,
+            detail="Too many practices are being generated right now. Please try again shortly.",
+            headers={"Retry-After": "5"}
         )
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Job status and, once done, the technique. Pass `wait` (seconds, max 30)
+    to long-poll until the job finishes.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if wait > 0:
+        await job_queue.wait(job, timeout=min(wait, 30))
+    return job.to_dict()
+
+@app.post("/generate-technique/stream")
+async def generate_technique_stream(assessment: AssessmentAnswers, request: Request,
+                                   mode: str = Query('model', pattern=GENERATION_MODES)):
+    """
+    Stream the practice as Server-Sent Events, one `section` event per completed field,
+    followed by a `complete` event carrying the full validated technique
+    """
+    admit_client(request)
+    answers = canonical_answers(assessment.answers)
+    cache_key = answers_key(answers, PROMPT_VERSION, MODEL_NAME)
+
+    stored = None
+    fallback = False
+    distance = None
+    if mode == 'local':
+        stored = local_technique(answers).model_dump()
+    if stored is None and precomputed is not None:
+        stored = precomputed.get(answers)
+    if stored is None and technique_cache is not None:
+        stored = await cache_call(technique_cache.get, cache_key)
+    if stored is None:
+        match = find_neighbor(answers)
+        if match is not None:
+            stored, distance = match
+
+    if stored is None and not model_available() and DEGRADED_MODE == 'local':
+        stored = degraded_technique(answers).model_dump()
+        fallback = True
+    if stored is None and model_available() and model_guard.breaker.is_open:
+        stored = degraded_technique(answers).model_dump()
+        fallback = True
+    if stored is None and not model_available():
+        raise HTTPException(
+            status_code=500, 
+            detail="AI model not configured. Please check the GEMINI_API_KEY and MODEL_BACKEND environment variables."
+        )
+
+    generation = None
+    feed = None
+    if stored is None:
+        # An identical assessment already being generated is followed, not generated
+        # again; model quota is taken inside the generation, so followers never queue for it
+        own_feed = EventFeed()
+        with request_budget(model_guard.default_budget):
+            generation = inflight.start(
+                cache_key,
+                lambda: generate_fresh(answers, cache_key, own_feed),
+                lookup=lambda: stored_technique(cache_key),
+                feed=own_feed
+            )
+        feed = inflight.feed(cache_key)
+        if feed is own_feed:
+            # Wait only for admission, so a shed request still gets a 503 instead of a broken stream
+            await feed.wait_begun()
+            if generation.done() and not generation.cancelled() and isinstance(generation.exception(), AdmissionError):
+                raise generation.exception()
+
+    async def events():
+        if stored is not None:
+            for field in REQUIRED_FIELDS:
+                yield sse_event("section", {"name": field, "value": stored[field]})
+            yield sse_event("complete", {"technique": stored, "fallback": fallback, "match_distance": distance})
+            return
+
+        # Sections of the shared generation as they complete, from the start
+        sent = set()
+        if feed is not None:
+            async for field, value in feed.follow():
+                sent.add(field)
+                yield sse_event("section", {"name": field, "value": value})
+        try:
+            resolved = await asyncio.shield(generation)
+        except AdmissionError as e:
+            yield sse_event("error", {"detail": e.detail, "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            yield sse_event("error", {"detail": str(getattr(e, 'detail', e))})
+            return
+
+        # A degraded plan replaces whatever was streamed; otherwise send the
+        # sections that were regenerated after the stream or arrived without one
+        replaced = resolved.source == 'degraded'
+        for field in REQUIRED_FIELDS:
+            if replaced or field not in sent:
+                yield sse_event("section", {"name": field, "value": resolved.technique[field]})
+        yield sse_event("complete", {"technique": resolved.technique, "fallback": replaced})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
+    import uvicorn
+
+    # Development server with auto-reload; use serve.py in production
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
         reload=True
-    )
\ No newline at end of file
+    )
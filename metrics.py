@@ -0,0 +1,91 @@
+# metrics.py - Prometheus metrics for the Equanimity API
+from prometheus_client import Counter, Gauge, Histogram
+
+# Per-stage latency of a technique generation
+STAGE_SECONDS = Histogram(
+    'equanimity_stage_seconds',
+    'Time spent in each stage of technique generation',
+    ['stage'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+
+FALLBACK_RESPONSES = Counter(
+    'equanimity_fallback_responses_total',
+    'Requests answered with a degraded-mode technique instead of a model-generated one'
+)
+
+PARSE_ERRORS = Counter(
+    'equanimity_parse_errors_total',
+    'Model responses that were missing fields or could not be parsed'
+)
+
+HTTP_RESPONSES = Counter(
+    'equanimity_http_responses_total',
+    'HTTP responses by route and status code',
+    ['path', 'status']
+)
+
+PROMPT_TOKENS = Counter(
+    'equanimity_prompt_tokens_total',
+    'Estimated input tokens sent to the model, by prompt version',
+    ['version']
+)
+
+NEIGHBOR_MATCH_DISTANCE = Histogram(
+    'equanimity_neighbor_match_distance',
+    'Profile distance of requests served a nearby profile\'s technique',
+    buckets=(0.01, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.75, 1)
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    'equanimity_requests_in_flight',
+    'HTTP requests currently being handled'
+)
+
+
+# Gauges fed by the objects passed to the register_* functions below. Defined
+# here, once, because uvicorn's reloader and worker processes import main.py
+# a second time as __mp_main__.
+PROMPT_INFO = Gauge('equanimity_prompt_info', 'Active prompt template version', ['version'])
+PROMPT_PREFIX_TOKENS = Gauge('equanimity_prompt_prefix_tokens', 'Tokens in the static prompt prefix', ['version'])
+CACHE_HITS = Gauge('equanimity_cache_hits', 'Result cache hits')
+CACHE_MISSES = Gauge('equanimity_cache_misses', 'Result cache misses')
+CACHE_HIT_RATIO = Gauge('equanimity_cache_hit_ratio', 'Result cache hit ratio')
+COALESCED_REQUESTS = Gauge('equanimity_coalesced_requests', 'Requests that shared an in-flight generation')
+BREAKER_OPEN = Gauge('equanimity_breaker_open', 'Whether the model circuit breaker is refusing calls')
+BREAKER_TRIPS = Gauge('equanimity_breaker_trips', 'Times the model circuit breaker has opened')
+HEDGED_REQUESTS = Gauge('equanimity_hedged_requests', 'Model calls that sent a hedged second attempt')
+ADMISSION_WAITING = Gauge('equanimity_admission_waiting', 'Model calls waiting for quota')
+ADMISSION_SHED = Gauge('equanimity_admission_shed', 'Requests shed with 503 because the quota queue was full or too slow')
+CLIENTS_RATE_LIMITED = Gauge('equanimity_clients_rate_limited', 'Requests refused with 429 by per-client rate limits')
+
+
+def register_prompt_metrics(template, count_tokens) -> None:
+    """Publish the active prompt version and the size of its static prefix"""
+    PROMPT_INFO.labels(version=template.version).set(1)
+    PROMPT_PREFIX_TOKENS.labels(version=template.version).set(count_tokens(template.prefix))
+
+
+def register_cache_metrics(cache) -> None:
+    """Expose the result cache's own counters as gauges"""
+    CACHE_HITS.set_function(lambda: cache.hits)
+    CACHE_MISSES.set_function(lambda: cache.misses)
+    CACHE_HIT_RATIO.set_function(cache.hit_ratio)
+
+
+def register_singleflight_metrics(inflight) -> None:
+    COALESCED_REQUESTS.set_function(lambda: inflight.coalesced)
+
+
+def register_model_guard_metrics(guard) -> None:
+    """Expose circuit breaker state and hedging counters"""
+    BREAKER_OPEN.set_function(lambda: 1 if guard.breaker.is_open else 0)
+    BREAKER_TRIPS.set_function(lambda: guard.breaker.trips)
+    HEDGED_REQUESTS.set_function(lambda: guard.hedges)
+
+
+def register_admission_metrics(quota, clients) -> None:
+    """Expose the quota queue and the requests turned away by admission control"""
+    ADMISSION_WAITING.set_function(lambda: quota.waiting)
+    ADMISSION_SHED.set_function(lambda: quota.shed)
+    CLIENTS_RATE_LIMITED.set_function(lambda: clients.limited)
@@ -0,0 +1,125 @@
+# neighbors.py - Nearest-neighbor serving of previously generated techniques
+#
+# Every assessment maps onto a point in [0, 1]^5, one coordinate per question,
+# running from its most reactive option (0) to its most equanimous one (1).
+# An assessment within NEIGHBOR_MAX_DISTANCE of a profile that already has a
+# technique is served that technique without calling the model. Distances are
+# root-mean-square per question, so 0.15 lets one answer differ by one option.
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from questions import QUESTIONS
+
+
+class ProfileVectorizer:
+    """Reactivity-to-equanimity score per question, from the keyword vocabulary"""
+
+    def __init__(self, questions: List[Dict[str, Any]] = QUESTIONS):
+        self.question_keys = [str(question["number"]) for question in questions]
+        # Keyword -> score within each question, and averaged over all questions
+        self._scores: List[Dict[str, float]] = []
+        pooled: Dict[str, List[float]] = {}
+        for question in questions:
+            scores = {}
+            last = len(question["options"]) - 1
+            for index, (_, keywords) in enumerate(question["options"]):
+                for keyword in keywords.split(', '):
+                    scores[keyword] = index / last
+                    pooled.setdefault(keyword, []).append(index / last)
+            self._scores.append(scores)
+        self._pooled = {keyword: sum(values) / len(values) for keyword, values in pooled.items()}
+
+    @property
+    def dimensions(self) -> int:
+        return len(self.question_keys)
+
+    def vectorize(self, answers: Dict[str, str]) -> Optional[np.ndarray]:
+        """
+        The profile vector of canonical answers. Keywords outside a question's
+        own options fall back to their score elsewhere in the vocabulary; an
+        answer with no known keyword at all has no vector.
+        """
+        if set(answers) != set(self.question_keys):
+            return None
+        vector = np.empty(self.dimensions)
+        for dimension, question_key in enumerate(self.question_keys):
+            scores = [self._scores[dimension].get(keyword, self._pooled.get(keyword))
+                      for keyword in answers[question_key].split(', ')]
+            scores = [score for score in scores if score is not None]
+            if not scores:
+                return None
+            vector[dimension] = sum(scores) / len(scores)
+        return vector
+
+
+class NeighborIndex:
+    """Profile vectors of generated techniques, searched by brute force"""
+
+    def __init__(self, max_distance: float, max_entries: int = 4096,
+                 vectorizer: Optional[ProfileVectorizer] = None):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.vectorizer = vectorizer or ProfileVectorizer()
+        self.matches = 0
+        self.misses = 0
+        self._vectors = np.zeros((max_entries, self.vectorizer.dimensions))
+        self._techniques: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def add(self, answers: Dict[str, str], technique: Dict[str, Any]) -> None:
+        vector = self.vectorizer.vectorize(answers)
+        if vector is None:
+            return
+        with self._lock:
+            same = np.flatnonzero(np.all(self._vectors[:self._count] == vector, axis=1))
+            if same.size:
+                self._techniques[same[0]] = technique
+                return
+            # Once full, the oldest entry is overwritten
+            slot = self._next
+            self._vectors[slot] = vector
+            self._techniques[slot] = technique
+            self._next = (slot + 1) % self.max_entries
+            self._count = min(self._count + 1, self.max_entries)
+
+    def nearest(self, answers: Dict[str, str]) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The closest technique within max_distance, and its distance"""
+        vector = self.vectorizer.vectorize(answers)
+        with self._lock:
+            if vector is None or self._count == 0:
+                self.misses += 1
+                return None
+            offsets = self._vectors[:self._count] - vector
+            distances = np.sqrt(np.einsum('ij,ij->i', offsets, offsets) / vector.size)
+            best = int(np.argmin(distances))
+            distance = float(distances[best])
+            if distance > self.max_distance:
+                self.misses += 1
+                return None
+            self.matches += 1
+            return self._techniques[best], distance
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "matches": self.matches,
+            "misses": self.misses
+        }
+
+
+def create_neighbor_index() -> Optional[NeighborIndex]:
+    """Build the index configured by NEIGHBOR_MAX_DISTANCE, or None when it is unset or 0"""
+    max_distance = float(os.getenv('NEIGHBOR_MAX_DISTANCE', '0'))
+    if max_distance <= 0:
+        return None
+    return NeighborIndex(max_distance, max_entries=int(os.getenv('NEIGHBOR_MAX_ENTRIES', '4096')))
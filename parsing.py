@@ -0,0 +1,142 @@
+# parsing.py - Parsing of model output into technique fields
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+
+class SectionScanner:
+    """Incrementally extract completed top-level fields from a streamed JSON object"""
+
+    def __init__(self):
+        self.buffer = ''
+        self.sections: Dict[str, Any] = {}
+        self.complete = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Add streamed text; return the (field, value) pairs completed by it"""
+        self.buffer += text
+        completed = []
+        while self._pos < len(self.buffer) and not self.complete:
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = self._depth > 0
+            elif char in '{[':
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = self._pos + 1
+            elif char in '}]' and self._depth > 0:
+                if self._depth == 1:
+                    completed.extend(self._close_member())
+                    self.complete = True
+                self._depth -= 1
+            elif char == ',' and self._depth == 1:
+                completed.extend(self._close_member())
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _close_member(self) -> List[Tuple[str, Any]]:
+        member = self.buffer[self._member_start:self._pos].strip()
+        if not member:
+            return []
+        try:
+            parsed = json.loads('{' + member + '}')
+        except json.JSONDecodeError:
+            return []
+        self.sections.update(parsed)
+        return list(parsed.items())
+
+
+# Keys every day of the plan must carry for the frontend to render it
+DAY_FIELDS = ['title', 'morning_practice', 'daily_integration', 'evening_reflection']
+
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '„': '"', '‟': '"', '″': '"',
+                               '‘': "'", '’': "'"})
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+
+def _candidates(text: str) -> Iterator[str]:
+    """The JSON object in the text, followed by progressively repaired versions of it"""
+    start = text.find('{')
+    if start == -1:
+        return
+    end = text.rfind('}')
+    candidate = text[start:end + 1] if end > start else text[start:]
+    yield candidate
+    without_commas = _TRAILING_COMMA.sub(r'\1', candidate)
+    yield without_commas
+    yield without_commas.translate(_SMART_QUOTES)
+
+
+@lru_cache(maxsize=None)
+def _adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def _field_errors(name: str, value: Any, model_cls: Type[BaseModel]) -> Optional[str]:
+    field = model_cls.model_fields.get(name)
+    if field is None:
+        return f"unknown field {name}"
+    try:
+        value = _adapter(field.annotation).validate_python(value)
+    except ValidationError as e:
+        return str(e)
+    if isinstance(value, str) and not value.strip():
+        return f"empty field {name}"
+    if name.startswith('day') and isinstance(value, dict):
+        absent = [key for key in DAY_FIELDS if not str(value.get(key, '')).strip()]
+        if absent:
+            return f"{name} missing {', '.join(absent)}"
+    return None
+
+
+def parse_technique_fields(text: str, model_cls: Type[BaseModel]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Recover every valid field of model_cls from model output.
+
+    Tolerates preamble and trailing commentary, code fences, trailing commas,
+    smart quotes and truncated output. Returns the valid fields and the names
+    of the fields that are missing or invalid.
+    """
+    data: Dict[str, Any] = {}
+    for candidate in _candidates(text):
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            data = parsed
+            break
+    else:
+        # Salvage the members that were complete before the output broke off
+        scanner = SectionScanner()
+        repaired = _TRAILING_COMMA.sub(r'\1', text)
+        scanner.feed(repaired)
+        data = scanner.sections
+        if not data:
+            scanner = SectionScanner()
+            scanner.feed(repaired.translate(_SMART_QUOTES))
+            data = scanner.sections
+
+    fields = {}
+    for name in model_cls.model_fields:
+        if name in data and _field_errors(name, data[name], model_cls) is None:
+            fields[name] = data[name]
+    missing = [name for name in model_cls.model_fields if name not in fields]
+    return fields, missing
+
@@ -0,0 +1,154 @@
+# precompute.py - Offline generation of the full assessment profile space
+#
+# Usage:
+#   python precompute.py --concurrency 4
+#
+# Every combination of answers in questions.QUESTIONS is generated once and
+# written to a gzipped store that main.py loads at startup. Progress is
+# checkpointed after each profile, so an interrupted run resumes where it
+# stopped. Checkpoint lines record the prompt version and model they were
+# generated with; a run for another prompt version or model regenerates them.
+import argparse
+import asyncio
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from questions import PROFILE_COUNT, answers_for_index, profile_index
+
+DEFAULT_OUTPUT = 'precomputed_techniques.json.gz'
+DEFAULT_CHECKPOINT = 'precompute_checkpoint.jsonl'
+
+
+class PrecomputedStore:
+    """Techniques for every profile, indexed by questions.profile_index"""
+
+    def __init__(self, techniques: List[Optional[Dict[str, Any]]], prompt_version: str, model_name: str):
+        self.techniques = techniques
+        self.prompt_version = prompt_version
+        self.model_name = model_name
+
+    def get(self, answers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        index = profile_index(answers)
+        if index is None:
+            return None
+        return self.techniques[index]
+
+    def __len__(self) -> int:
+        return sum(1 for technique in self.techniques if technique is not None)
+
+    def save(self, path: str) -> None:
+        payload = {
+            "prompt_version": self.prompt_version,
+            "model": self.model_name,
+            "techniques": self.techniques
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, prompt_version: str, model_name: str) -> Optional["PrecomputedStore"]:
+        """Load a store, ignoring it if it was built for another prompt or model"""
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get("prompt_version") != prompt_version or payload.get("model") != model_name:
+            print(f"Warning: ignoring precomputed store {path} built for another prompt version or model")
+            return None
+        techniques = payload.get("techniques", [])
+        if len(techniques) != PROFILE_COUNT:
+            print(f"Warning: ignoring precomputed store {path} with {len(techniques)} profiles")
+            return None
+        return cls(techniques, prompt_version, model_name)
+
+
+def read_checkpoint(path: str, prompt_version: str, model_name: str) -> Dict[int, Dict[str, Any]]:
+    """Profiles a previous (possibly interrupted) run completed for this prompt version and model"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    stale = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run
+                continue
+            if entry.get("prompt_version") != prompt_version or entry.get("model") != model_name:
+                stale += 1
+                continue
+            done[entry["index"]] = entry["technique"]
+    if stale:
+        print(f"Warning: skipping {stale} checkpoint entries from another prompt version or model")
+    return done
+
+
+async def generate_profile(index: int, semaphore: asyncio.Semaphore) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """Generate and validate the technique for a single profile"""
+    import main
+
+    async with semaphore:
+        answers = answers_for_index(index)
+        try:
+            response_text = await main.call_model(main.build_prompt(answers))
+            technique = await main.complete_technique(answers, response_text)
+            if technique is None:
+                raise ValueError("model output could not be parsed")
+            return index, technique.model_dump()
+        except Exception as e:
+            print(f"Profile {index}: generation failed: {e}")
+            return index, None
+
+
+async def run(concurrency: int, checkpoint_path: str, output_path: str, limit: Optional[int] = None) -> int:
+    import main
+
+    if not main.model:
+        raise SystemExit("AI model not configured. Please check the GEMINI_API_KEY and MODEL_BACKEND environment variables.")
+
+    done = read_checkpoint(checkpoint_path, main.PROMPT_VERSION, main.MODEL_NAME)
+    pending = [index for index in range(PROFILE_COUNT) if index not in done]
+    if limit is not None:
+        pending = pending[:limit]
+    print(f"{len(done)} profiles already done, generating {len(pending)} with concurrency {concurrency}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [generate_profile(index, semaphore) for index in pending]
+    with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        for task in asyncio.as_completed(tasks):
+            index, technique = await task
+            if technique is None:
+                continue
+            done[index] = technique
+            checkpoint.write(json.dumps({
+                "index": index,
+                "prompt_version": main.PROMPT_VERSION,
+                "model": main.MODEL_NAME,
+                "technique": technique
+            }) + '\n')
+            checkpoint.flush()
+
+    techniques = [done.get(index) for index in range(PROFILE_COUNT)]
+    PrecomputedStore(techniques, main.PROMPT_VERSION, main.MODEL_NAME).save(output_path)
+    print(f"Wrote {len(done)}/{PROFILE_COUNT} profiles to {output_path}")
+    return PROFILE_COUNT - len(done)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Precompute techniques for every assessment profile")
+    parser.add_argument('--concurrency', type=int, default=4, help="Maximum concurrent model calls")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="JSONL checkpoint used to resume")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Store loaded by the API at startup")
+    parser.add_argument('--limit', type=int, default=None, help="Only generate this many pending profiles")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    missing = asyncio.run(run(args.concurrency, args.checkpoint, args.output, args.limit))
+    raise SystemExit(1 if missing and args.limit is None else 0)
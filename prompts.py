@@ -0,0 +1,219 @@
+# prompts.py - Versioned prompt templates for technique generation
+#
+# Each template is a static prefix shared by every request plus a small
+# per-user suffix carrying the assessment keywords. Keeping the prefix
+# byte-identical lets providers reuse it across calls, and keeping the
+# suffix small keeps per-request input tokens down.
+#
+# Usage:
+#   python prompts.py             # estimated token counts per template
+#   python prompts.py --model     # exact counts from the configured backend
+import argparse
+import math
+from typing import Dict, List, Optional
+
+KEYWORDS_PLACEHOLDER = '{keywords}'
+
+
+class PromptTemplate:
+    """A versioned prompt: static prefix followed by a keyword suffix"""
+
+    def __init__(self, version: str, prefix: str, suffix: str, description: str):
+        self.version = version
+        self.prefix = prefix
+        self.suffix = suffix
+        self.description = description
+
+    def render(self, keywords: List[str]) -> str:
+        return self.prefix + self.suffix.replace(KEYWORDS_PLACEHOLDER, ', '.join(keywords))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) when no tokenizer is at hand"""
+    return math.ceil(len(text) / 4)
+
+
+# Version 1: the original prompt, keywords embedded near the top
+PROMPT_V1 = PromptTemplate(
+    '1',
+    """
+You are a renowned Buddhist meditation teacher and mindfulness coach with deep expertise in equanimity practices. Based on this psychological profile from a 5-question assessment, create a transformative 3-day equanimity practice.
+
+""",
+    """ASSESSMENT KEYWORDS: {keywords}
+
+The user's responses reveal their current patterns with:
+1. Stress response and challenge management
+2. Reception of criticism and feedback
+3. Emotional regulation and awareness
+4. Control, surrender, and acceptance
+5. Relationship with pleasure/pain, success/failure
+
+Create a response in this EXACT JSON format (no additional text):
+
+{
+    "technique_title": "A poetic, inspiring name for the practice (4-8 words)",
+    "description": "2-3 sentences explaining why this practice perfectly suits their current state and how it will cultivate deep equanimity",
+    "insight": "One profound, personally relevant insight about equanimity that speaks directly to their patterns",
+    "day1": {
+        "title": "Foundation theme (2-3 words like 'Grounding Awareness')",
+        "morning_practice": "Detailed 10-15 minute morning practice with step-by-step instructions",
+        "daily_integration": "Specific techniques to apply throughout the day, with concrete examples",
+        "evening_reflection": "5-10 minute evening practice with clear guidance"
+    },
+    "day2": {
+        "title": "Deepening theme (2-3 words like 'Expanding Presence')", 
+        "morning_practice": "Building on day 1, slightly more advanced morning practice",
+        "daily_integration": "Deeper integration techniques for real-life challenges",
+        "evening_reflection": "More sophisticated evening practice for integration"
+    },
+    "day3": {
+        "title": "Integration theme (2-3 words like 'Embodied Wisdom')",
+        "morning_practice": "Most refined version connecting to their natural equanimity",
+        "daily_integration": "How to make equanimity a permanent life orientation",
+        "evening_reflection": "Celebration practice and commitment to ongoing development"
+    },
+    "zen_quote": "A relevant, inspiring quote from Buddhist tradition that resonates with their specific journey",
+    "long_term_guidance": "Practical advice for maintaining and deepening this practice beyond 3 days, tailored to their patterns"
+}
+
+Requirements:
+- Make it deeply personal and transformative
+- Use practical, actionable techniques they can actually implement
+- Draw from Vipassana, Zen, Tibetan Buddhism while staying accessible
+- Address their specific emotional/mental patterns revealed in keywords
+- Build progressively over 3 days toward lasting transformation
+- Include specific meditation techniques, breathing practices, mindfulness exercises
+- Provide concrete examples of how to apply teachings in daily situations
+
+Focus on creating genuine wisdom that leads to freedom from reactivity and the development of unshakeable inner peace.
+""",
+    "Original prompt with keywords embedded near the top"
+)
+
+# Version 2: same instructions, all static text first and keywords last
+PROMPT_V2 = PromptTemplate(
+    '2',
+    """
+You are a renowned Buddhist meditation teacher and mindfulness coach with deep expertise in equanimity practices. Based on the psychological profile from a 5-question assessment given at the end, create a transformative 3-day equanimity practice.
+
+The user's responses reveal their current patterns with:
+1. Stress response and challenge management
+2. Reception of criticism and feedback
+3. Emotional regulation and awareness
+4. Control, surrender, and acceptance
+5. Relationship with pleasure/pain, success/failure
+
+Create a response in this EXACT JSON format (no additional text):
+
+{
+    "technique_title": "A poetic, inspiring name for the practice (4-8 words)",
+    "description": "2-3 sentences explaining why this practice perfectly suits their current state and how it will cultivate deep equanimity",
+    "insight": "One profound, personally relevant insight about equanimity that speaks directly to their patterns",
+    "day1": {
+        "title": "Foundation theme (2-3 words like 'Grounding Awareness')",
+        "morning_practice": "Detailed 10-15 minute morning practice with step-by-step instructions",
+        "daily_integration": "Specific techniques to apply throughout the day, with concrete examples",
+        "evening_reflection": "5-10 minute evening practice with clear guidance"
+    },
+    "day2": {
+        "title": "Deepening theme (2-3 words like 'Expanding Presence')", 
+        "morning_practice": "Building on day 1, slightly more advanced morning practice",
+        "daily_integration": "Deeper integration techniques for real-life challenges",
+        "evening_reflection": "More sophisticated evening practice for integration"
+    },
+    "day3": {
+        "title": "Integration theme (2-3 words like 'Embodied Wisdom')",
+        "morning_practice": "Most refined version connecting to their natural equanimity",
+        "daily_integration": "How to make equanimity a permanent life orientation",
+        "evening_reflection": "Celebration practice and commitment to ongoing development"
+    },
+    "zen_quote": "A relevant, inspiring quote from Buddhist tradition that resonates with their specific journey",
+    "long_term_guidance": "Practical advice for maintaining and deepening this practice beyond 3 days, tailored to their patterns"
+}
+
+Requirements:
+- Make it deeply personal and transformative
+- Use practical, actionable techniques they can actually implement
+- Draw from Vipassana, Zen, Tibetan Buddhism while staying accessible
+- Address their specific emotional/mental patterns revealed in keywords
+- Build progressively over 3 days toward lasting transformation
+- Include specific meditation techniques, breathing practices, mindfulness exercises
+- Provide concrete examples of how to apply teachings in daily situations
+
+Focus on creating genuine wisdom that leads to freedom from reactivity and the development of unshakeable inner peace.
+""",
+    """
+ASSESSMENT KEYWORDS: {keywords}
+""",
+    "Original instructions as a static prefix with a keyword-only suffix"
+)
+
+# Version 2-compact: condensed instructions and schema for lower input cost
+PROMPT_V2_COMPACT = PromptTemplate(
+    '2-compact',
+    """You are a Buddhist meditation teacher. Create a personal, progressive 3-day equanimity practice (Vipassana, Zen, Tibetan; accessible) for the assessment keywords at the end, which describe their stress response, reaction to criticism, emotional regulation, relationship to control, and to pleasure/pain.
+
+Reply with ONLY this JSON:
+{"technique_title": "poetic name, 4-8 words",
+"description": "2-3 sentences on why it fits them",
+"insight": "one insight on equanimity for their patterns",
+"day1": {"title": "2-3 word foundation theme", "morning_practice": "10-15 min, step by step", "daily_integration": "techniques with concrete examples", "evening_reflection": "5-10 min guidance"},
+"day2": {"title": "deepening theme", "morning_practice": "...", "daily_integration": "...", "evening_reflection": "..."},
+"day3": {"title": "integration theme", "morning_practice": "...", "daily_integration": "...", "evening_reflection": "..."},
+"zen_quote": "relevant Buddhist quote",
+"long_term_guidance": "how to continue beyond 3 days"}
+""",
+    """
+KEYWORDS: {keywords}
+""",
+    "Condensed instructions and schema"
+)
+
+PROMPTS: Dict[str, PromptTemplate] = {
+    template.version: template for template in (PROMPT_V1, PROMPT_V2, PROMPT_V2_COMPACT)
+}
+DEFAULT_PROMPT_VERSION = '2'
+
+
+def get_prompt(version: Optional[str] = None) -> PromptTemplate:
+    """Look up a template by version, defaulting to DEFAULT_PROMPT_VERSION"""
+    version = version or DEFAULT_PROMPT_VERSION
+    if version not in PROMPTS:
+        raise ValueError(f"Unknown prompt version: {version} (available: {', '.join(PROMPTS)})")
+    return PROMPTS[version]
+
+
+def token_report(count_tokens=estimate_tokens) -> List[Dict[str, object]]:
+    """Prefix, suffix and total token counts per template for a typical assessment"""
+    from questions import answers_for_index
+
+    keywords = []
+    for answer in answers_for_index(0).values():
+        keywords.extend(answer.split(', '))
+
+    report = []
+    for template in PROMPTS.values():
+        suffix = template.suffix.replace(KEYWORDS_PLACEHOLDER, ', '.join(keywords))
+        report.append({
+            "version": template.version,
+            "prefix_tokens": count_tokens(template.prefix),
+            "suffix_tokens": count_tokens(suffix),
+            "total_tokens": count_tokens(template.render(keywords))
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Token counts per prompt template")
+    parser.add_argument('--model', action='store_true', help="Count with the configured model backend")
+    args = parser.parse_args()
+
+    count_tokens = estimate_tokens
+    if args.model:
+        from backends import create_backend
+        count_tokens = create_backend('gemini-pro').count_tokens
+
+    print(f"{'version':<12} {'prefix':>8} {'suffix':>8} {'total':>8}")
+    for row in token_report(count_tokens):
+        print(f"{row['version']:<12} {row['prefix_tokens']:>8} {row['suffix_tokens']:>8} {row['total_tokens']:>8}")
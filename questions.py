@@ -0,0 +1,182 @@
+# questions.py - Assessment question bank, served to the frontend by GET /questions
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+# Questions data
+QUESTIONS = [
+    {
+        "number": 1,
+        "text": "When facing unexpected challenges or setbacks, what is your most natural response?",
+        "options": [
+            ("I feel immediately overwhelmed and react strongly", "reactive, overwhelming, scattered, intense, turbulent"),
+            ("I become anxious and worry about outcomes", "anxious, worried, uncertain, restless, concerned"),
+            ("I pause to analyze and plan my response", "analyzing, planning, methodical, logical, structured"),
+            ("I accept what is and adapt with minimal resistance", "accepting, flowing, adaptable, resilient, balanced")
+        ]
+    },
+    {
+        "number": 2,
+        "text": "How do you typically respond to criticism or negative feedback from others?",
+        "options": [
+            ("I feel hurt and become defensive", "defensive, hurt, rejected, wounded, protective"),
+            ("I ruminate and question my self-worth", "ruminating, doubting, questioning, insecure, overthinking"),
+            ("I evaluate if there's truth to consider", "evaluating, discerning, selective, rational, measured"),
+            ("I receive it as information for growth", "grateful, learning, growing, open, receptive")
+        ]
+    },
+    {
+        "number": 3,
+        "text": "When experiencing intense emotions (anger, sadness, fear), what best describes your relationship with them?",
+        "options": [
+            ("I become completely consumed by the emotion", "consumed, identified, merged, lost, overwhelmed"),
+            ("I try to suppress or avoid the feeling", "suppressing, avoiding, numbing, escaping, denying"),
+            ("I work through it with effort and understanding", "understanding, processing, working, healing, therapeutic"),
+            ("I observe it with spacious awareness", "witnessing, observing, spacious, present, aware")
+        ]
+    },
+    {
+        "number": 4,
+        "text": "How do you approach situations where you cannot control the outcome?",
+        "options": [
+            ("I fight harder to maintain control", "fighting, forcing, pushing, struggling, resisting"),
+            ("I feel frustrated and helpless", "frustrated, helpless, powerless, defeated, stuck"),
+            ("I focus on what I can influence", "focusing, manageable, practical, actionable, organized"),
+            ("I surrender to the flow of life", "surrendering, trusting, releasing, peaceful, flowing")
+        ]
+    },
+    {
+        "number": 5,
+        "text": "What is your relationship with pleasure and success versus pain and failure?",
+        "options": [
+            ("I cling to pleasure and desperately avoid pain", "clinging, addicted, desperate, dependent, attached"),
+            ("I swing between highs and lows dramatically", "swinging, unstable, moody, reactive, volatile"),
+            ("I try to maintain balance through discipline", "moderating, balancing, managing, controlled, disciplined"),
+            ("I remain relatively unchanged by either", "equanimous, steady, unchanged, centered, stable")
+        ]
+    }
+]
+
+OPTIONS_PER_QUESTION = 4
+PROFILE_COUNT = OPTIONS_PER_QUESTION ** len(QUESTIONS)
+
+# Content hash of the bank: changes whenever a question, option or keyword changes
+QUESTION_BANK_VERSION = hashlib.sha256(
+    json.dumps(QUESTIONS, sort_keys=True, separators=(',', ':')).encode('utf-8')
+).hexdigest()[:12]
+
+# Keyword string -> option index, per question number
+_OPTION_INDEX = {
+    str(question["number"]): {keywords: index for index, (_, keywords) in enumerate(question["options"])}
+    for question in QUESTIONS
+}
+
+# Question id ("q1") and legacy question number ("1") -> question number
+_QUESTION_NUMBERS = {
+    **{f"q{question['number']}": str(question["number"]) for question in QUESTIONS},
+    **{str(question["number"]): str(question["number"]) for question in QUESTIONS}
+}
+
+# Option id -> canonical keyword string, per question number: the lookup table
+# that expands compact submissions into the answers prompts and caches are keyed on
+_OPTION_KEYWORDS = {
+    str(question["number"]): tuple(keywords for _, keywords in question["options"])
+    for question in QUESTIONS
+}
+
+
+def question_bank() -> Dict[str, Any]:
+    """The bank as served by GET /questions: option ids are what clients submit"""
+    return {
+        "version": QUESTION_BANK_VERSION,
+        "questions": [
+            {
+                "id": f"q{question['number']}",
+                "number": question["number"],
+                "text": question["text"],
+                "options": [
+                    {"id": index, "text": text, "keywords": keywords}
+                    for index, (text, keywords) in enumerate(question["options"])
+                ]
+            }
+            for question in QUESTIONS
+        ]
+    }
+
+
+def expand_answers(submitted: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Canonical answers for a submission of option ids ({"q1": 2, ...}). The
+    keyword strings older clients send ({"1": "analyzing, planning, ..."})
+    are accepted when they name an option exactly. Raises ValueError unless
+    every question is answered once with a known option.
+    """
+    answers = {}
+    for key, value in submitted.items():
+        number = _QUESTION_NUMBERS.get(str(key).strip())
+        if number is None:
+            raise ValueError(f"Unknown question {key!r}")
+        if number in answers:
+            raise ValueError(f"Question {key!r} is answered twice")
+        if isinstance(value, int) and not isinstance(value, bool):
+            if not 0 <= value < len(_OPTION_KEYWORDS[number]):
+                raise ValueError(f"Question {key!r} has no option {value}")
+            answers[number] = _OPTION_KEYWORDS[number][value]
+        elif isinstance(value, str):
+            keywords = ', '.join(kw.strip().lower() for kw in value.split(',') if kw.strip())
+            if keywords not in _OPTION_INDEX[number]:
+                raise ValueError(f"Question {key!r} has no option with keywords {value!r}")
+            answers[number] = keywords
+        else:
+            raise ValueError(f"Question {key!r} must be answered with an option id")
+    missing = [f"q{number}" for number in _OPTION_KEYWORDS if number not in answers]
+    if missing:
+        raise ValueError(f"Unanswered questions: {', '.join(missing)}")
+    return {number: answers[number] for number in _OPTION_KEYWORDS}
+
+
+def answer_options(answers: Dict[str, str]) -> Optional[List[int]]:
+    """The chosen option index per question, or None unless every answer is a known option"""
+    if set(answers) != set(_OPTION_INDEX):
+        return None
+    options = []
+    for question in QUESTIONS:
+        option = _OPTION_INDEX[str(question["number"])].get(answers[str(question["number"])])
+        if option is None:
+            return None
+        options.append(option)
+    return options
+
+
+def profile_index(answers: Dict[str, str]) -> Optional[int]:
+    """Map a canonical answer set onto its index in the 4^5 profile space"""
+    options = answer_options(answers)
+    if options is None:
+        return None
+    index = 0
+    for option in reversed(options):
+        index = index * OPTIONS_PER_QUESTION + option
+    return index
+
+
+def answers_for_index(index: int) -> Dict[str, str]:
+    """Inverse of profile_index: the answer set for a profile index"""
+    answers = {}
+    for question in QUESTIONS:
+        index, option = divmod(index, OPTIONS_PER_QUESTION)
+        answers[str(question["number"])] = _OPTION_KEYWORDS[str(question["number"])][option]
+    return answers
+
+
+def choices_for_index(index: int) -> Dict[str, int]:
+    """The option ids of a profile index, as a client submits them"""
+    choices = {}
+    for question in QUESTIONS:
+        index, option = divmod(index, OPTIONS_PER_QUESTION)
+        choices[f"q{question['number']}"] = option
+    return choices
+
+
+def all_profiles() -> List[Dict[str, str]]:
+    """Every valid answer set, ordered by profile index"""
+    return [answers_for_index(index) for index in range(PROFILE_COUNT)]
@@ -0,0 +1,256 @@
+# resilience.py - Deadlines, hedged requests and a circuit breaker for model calls
+#
+# Every request gets a latency budget (MODEL_BUDGET_SECONDS) shared by all of
+# its model calls, including repairs. A call still running after the
+# HEDGE_PERCENTILE of recent latencies is duplicated and the first answer
+# wins. Errors, timeouts and calls slower than BREAKER_SLOW_CALL_SECONDS count
+# against a circuit breaker; while it is open the model is not called at all.
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the model while the circuit breaker is open"""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's latency budget runs out before the model answers"""
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar('model_deadline', default=None)
+
+
+@contextmanager
+def request_budget(seconds: float) -> Iterator[None]:
+    """Give the model calls made inside the block a shared deadline"""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget(default: float) -> float:
+    """Seconds left before the current request's deadline, or default outside one"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Closed until the share of bad calls in the recent window reaches
+    failure_ratio, then open for reset_seconds, then half-open: one probe
+    call decides whether it closes again or reopens.
+    """
+
+    def __init__(self, failure_ratio: float = 0.5, window: int = 20, min_calls: int = 5,
+                 slow_call_seconds: float = 20, reset_seconds: float = 30):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are being refused right now, without claiming the half-open probe"""
+        if self.state == 'open':
+            return time.monotonic() - self._opened_at < self.reset_seconds
+        return self.state == 'half_open' and self._probing
+
+    def allow(self) -> bool:
+        """Whether a model call may start now"""
+        if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self.state = 'half_open'
+        if self.state == 'closed':
+            return True
+        if self.state == 'half_open' and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, ok: bool, latency: float) -> None:
+        bad = not ok or latency >= self.slow_call_seconds
+        if self.state == 'half_open':
+            self._probing = False
+            if bad:
+                self._open()
+            else:
+                self.state = 'closed'
+                self._outcomes.clear()
+            return
+        self._outcomes.append(bad)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio:
+            self._open()
+
+    def abandon(self) -> None:
+        """A call allowed through ended without an outcome (e.g. the client left)"""
+        self._probing = False
+
+    def _open(self) -> None:
+        self.state = 'open'
+        self.trips += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "recent_bad_calls": sum(self._outcomes),
+            "recent_calls": len(self._outcomes)
+        }
+
+
+class LatencyTracker:
+    """Recent successful model call latencies"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class ModelGuard:
+    """Run blocking model calls on an executor with a deadline, hedging and a circuit breaker"""
+
+    def __init__(self, executor: Executor, breaker: CircuitBreaker, default_budget: float = 25,
+                 hedge_percentile: float = 0, hedge_min_delay: float = 1.0,
+                 latencies: Optional[LatencyTracker] = None,
+                 admit_hedge: Optional[Callable[[], bool]] = None):
+        self.executor = executor
+        self.breaker = breaker
+        self.default_budget = default_budget
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = latencies or LatencyTracker()
+        # Whether a hedge may spend model quota right now; hedges never wait for it
+        self.admit_hedge = admit_hedge or (lambda: True)
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before sending a second attempt, or None to never hedge"""
+        if self.hedge_percentile <= 0:
+            return None
+        threshold = self.latencies.percentile(self.hedge_percentile)
+        if threshold is None:
+            return None
+        return max(self.hedge_min_delay, threshold)
+
+    def remaining(self) -> float:
+        return remaining_budget(self.default_budget)
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        timeout = self.remaining()
+        if timeout <= 0:
+            self.deadline_exceeded += 1
+            raise DeadlineExceededError("Request budget exhausted before the model call")
+        if not self.breaker.allow():
+            raise CircuitOpenError("Model circuit breaker is open")
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        attempts = [self._submit(loop, fn, *args)]
+        try:
+            delay = self.hedge_delay()
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done and self.admit_hedge():
+                    self.hedges += 1
+                    attempts.append(self._submit(loop, fn, *args))
+            result = await self._first_result(attempts, timeout - (time.monotonic() - started))
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except Exception:
+            self.breaker.record(False, time.monotonic() - started)
+            raise
+        finally:
+            # Attempts still queued are dropped; a running thread cannot be interrupted
+            for attempt in attempts:
+                attempt.cancel()
+
+        latency = time.monotonic() - started
+        self.latencies.add(latency)
+        self.breaker.record(True, latency)
+        return result
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, fn: Callable[..., Any], *args: Any) -> asyncio.Future:
+        future = loop.run_in_executor(self.executor, fn, *args)
+        # Losing attempts may fail after the winner returned; their errors are not needed
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return future
+
+    async def _first_result(self, attempts: List[asyncio.Future], timeout: float) -> Any:
+        """The first successful attempt's result; the first error if they all fail"""
+        deadline = time.monotonic() + timeout
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                self.deadline_exceeded += 1
+                raise DeadlineExceededError(f"Model did not answer within {timeout:.1f}s")
+            for attempt in done:
+                if attempt.exception() is None:
+                    if attempt is not attempts[0]:
+                        self.hedge_wins += 1
+                    return attempt.result()
+                error = error or attempt.exception()
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_seconds": self.default_budget,
+            "breaker": self.breaker.stats(),
+            "hedge_percentile": self.hedge_percentile or None,
+            "hedge_delay_seconds": self.hedge_delay(),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded
+        }
+
+
+def create_model_guard(executor: Executor, admit_hedge: Optional[Callable[[], bool]] = None) -> ModelGuard:
+    """Build the guard configured by MODEL_BUDGET_SECONDS, HEDGE_* and BREAKER_*"""
+    breaker = CircuitBreaker(
+        failure_ratio=float(os.getenv('BREAKER_FAILURE_RATIO', '0.5')),
+        window=int(os.getenv('BREAKER_WINDOW', '20')),
+        min_calls=int(os.getenv('BREAKER_MIN_CALLS', '5')),
+        slow_call_seconds=float(os.getenv('BREAKER_SLOW_CALL_SECONDS', '20')),
+        reset_seconds=float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+    )
+    return ModelGuard(
+        executor,
+        breaker,
+        default_budget=float(os.getenv('MODEL_BUDGET_SECONDS', '25')),
+        hedge_percentile=float(os.getenv('HEDGE_PERCENTILE', '0')),
+        hedge_min_delay=float(os.getenv('HEDGE_MIN_DELAY_SECONDS', '1')),
+        admit_hedge=admit_hedge
+    )
@@ -0,0 +1,114 @@
+# response_bench.py - Serialization CPU and bytes on the wire per technique response
+#
+# Compares, in process and without a server, FastAPI's usual path for a
+# stored technique (build the model, validate it through response_model,
+# render JSON) with serving the pre-encoded bytes from responses.py, and
+# reports body sizes for identity, gzip and brotli encodings.
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+os.environ.setdefault('MODEL_BACKEND', 'stub')
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from composer import PlanComposer
+from main import TechniqueResponse
+from questions import PROFILE_COUNT, answers_for_index
+from responses import EncodedCache, encoded_response
+
+
+def make_request(method: str, headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": "/",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+async def before(techniques: list, field) -> float:
+    """CPU seconds to validate and serialize every technique the standard way"""
+    started = time.process_time()
+    for technique in techniques:
+        content = await serialize_response(field=field, response_content=TechniqueResponse(**technique))
+        JSONResponse(content)
+    return time.process_time() - started
+
+
+def after(keys: list, cache: EncodedCache, request: Request) -> float:
+    """CPU seconds to serve every technique from its stored encoding"""
+    started = time.process_time()
+    for key in keys:
+        encoded_response(request, cache.get(key))
+    return time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure technique response serialization CPU and size")
+    parser.add_argument('--profiles', type=int, default=200, help="distinct techniques")
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    composer = PlanComposer()
+    profiles = rng.sample(range(PROFILE_COUNT), min(args.profiles, PROFILE_COUNT))
+    stored = {str(profile): composer.compose(answers_for_index(profile)) for profile in profiles}
+    keys = [rng.choice(list(stored)) for _ in range(args.requests)]
+    techniques = [stored[key] for key in keys]
+
+    field = create_response_field(name="Response_generate_technique", type_=TechniqueResponse, mode="serialization")
+    before_cpu = asyncio.run(before(techniques, field))
+
+    cache = EncodedCache(max_entries=len(stored))
+    started = time.process_time()
+    for key, technique in stored.items():
+        cache.put(key, technique)
+    encode_cpu = time.process_time() - started
+
+    gzip_request = make_request('POST', {"accept-encoding": "gzip, deflate"})
+    best_request = make_request('POST', {"accept-encoding": "gzip, deflate, br"})
+    after_cpu = after(keys, cache, best_request)
+    etag = cache.get(keys[0]).etag
+    not_modified = make_request('GET', {"if-none-match": etag, "accept-encoding": "gzip, deflate, br"})
+    revalidate_cpu = after([keys[0]] * args.requests, cache, not_modified)
+
+    encoded = [cache.get(key) for key in stored]
+    encodings = encoded[0].encodings
+
+    def mean_size(encoding=None) -> float:
+        return round(sum(item.size(encoding) for item in encoded) / len(encoded), 1)
+
+    report = {
+        "requests": args.requests,
+        "distinct_techniques": len(stored),
+        "cpu_us_per_request": {
+            "before": round(before_cpu / args.requests * 1e6, 2),
+            "after": round(after_cpu / args.requests * 1e6, 2),
+            "after_304": round(revalidate_cpu / args.requests * 1e6, 2),
+            "one_time_encode_per_technique": round(encode_cpu / len(stored) * 1e6, 2)
+        },
+        "speedup": round(before_cpu / after_cpu, 1) if after_cpu else None,
+        "bytes_per_response": {
+            "before": mean_size(),
+            "gzip": mean_size('gzip'),
+            "br": mean_size('br') if 'br' in encodings else None,
+            "304": 0
+        },
+        "negotiated": {
+            "gzip, deflate": encoded_response(gzip_request, encoded[0]).headers.get('content-encoding'),
+            "gzip, deflate, br": encoded_response(best_request, encoded[0]).headers.get('content-encoding')
+        }
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# responses.py - Pre-serialized, pre-compressed JSON responses
+#
+# A technique that will not change (precomputed, cached or composed locally)
+# or the question bank is serialized and compressed once. Later requests get the stored bytes in
+# the best encoding the client accepts, with a strong ETag from the content
+# hash, and GET requests whose If-None-Match matches get 304 Not Modified.
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class EncodedBody:
+    """A JSON body, its compressed variants, its ETag and, for techniques, where it came from"""
+
+    def __init__(self, data: Dict[str, Any], source: Optional[str] = None):
+        self.source = source
+        # Same bytes as FastAPI's JSONResponse would produce
+        self.body = json.dumps(data, ensure_ascii=False, allow_nan=False,
+                               separators=(',', ':')).encode('utf-8')
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.encodings: Dict[str, bytes] = {'gzip': gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encodings['br'] = brotli.compress(self.body, quality=11)
+
+    def size(self, encoding: Optional[str] = None) -> int:
+        return len(self.encodings[encoding]) if encoding else len(self.body)
+
+
+class EncodedCache:
+    """LRU of encoded techniques under stable keys, e.g. a cache key"""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[EncodedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, technique: Dict[str, Any], source: Optional[str] = None) -> EncodedBody:
+        """Encode technique once and keep it under key"""
+        encoded = EncodedBody(technique, source)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, encoded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return encoded
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "encodings": ['gzip', 'br'] if brotli is not None else ['gzip']
+        }
+
+
+def create_encoded_cache() -> EncodedCache:
+    """Build the cache configured by RESPONSE_CACHE_ENTRIES and RESPONSE_CACHE_TTL_SECONDS"""
+    return EncodedCache(
+        max_entries=int(os.getenv('RESPONSE_CACHE_ENTRIES', '2048')),
+        ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+    )
+
+
+def negotiate_encoding(accept_encoding: str, available: Dict[str, bytes]) -> Optional[str]:
+    """The preferred available content coding in an Accept-Encoding header, if any"""
+    best, best_q = None, 0.0
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        candidates = list(available) if coding == '*' else [coding]
+        for candidate in candidates:
+            # At equal preference brotli wins, being the smaller of the two
+            if candidate in available and q > 0 and (q > best_q or (q == best_q and candidate == 'br')):
+                best, best_q = candidate, q
+    return best
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in tags or f'W/{etag}' in tags
+
+
+def encoded_response(request: Request, encoded: EncodedBody,
+                     headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serve stored bytes, honouring Accept-Encoding and, for GET, If-None-Match"""
+    extra = headers or {}
+    headers = {"ETag": encoded.etag, "Vary": "Accept-Encoding"}
+    if encoded.source is not None:
+        headers["X-Technique-Source"] = encoded.source
+    headers.update(extra)
+    if request.method in ('GET', 'HEAD') and etag_matches(request.headers.get('if-none-match', ''), encoded.etag):
+        return Response(status_code=304, headers=headers)
+
+    coding = negotiate_encoding(request.headers.get('accept-encoding', ''), encoded.encodings)
+    if coding is None:
+        return Response(encoded.body, media_type='application/json', headers=headers)
+    headers["Content-Encoding"] = coding
+    return Response(encoded.encodings[coding], media_type='application/json', headers=headers)
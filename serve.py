@@ -0,0 +1,36 @@
+# serve.py - Production launcher for the FastAPI backend
+#
+# Usage:
+#   WEB_CONCURRENCY=4 python serve.py
+#
+# Runs several uvicorn worker processes without the reloader. On SIGTERM,
+# workers stop accepting connections and give in-flight requests up to
+# GRACEFUL_SHUTDOWN_SECONDS (and queued jobs JOB_DRAIN_SECONDS) to finish.
+# This module does not import main.py, so worker processes load the app once.
+import os
+
+import uvicorn
+
+
+def main():
+    workers = int(os.getenv('WEB_CONCURRENCY', str(os.cpu_count() or 1)))
+    # Workers split server-wide limits such as MODEL_QUOTA_RPM between them
+    os.environ['WEB_CONCURRENCY'] = str(workers)
+    if workers > 1:
+        # Workers share results and in-flight leases through SQLite, not per-process memory
+        os.environ.setdefault('CACHE_BACKEND', 'sqlite')
+        if os.environ['CACHE_BACKEND'] != 'sqlite':
+            print(f"Warning: CACHE_BACKEND={os.environ['CACHE_BACKEND']} is not shared between {workers} workers")
+
+    uvicorn.run(
+        "main:app",
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', '8000')),
+        workers=workers,
+        timeout_graceful_shutdown=float(os.getenv('GRACEFUL_SHUTDOWN_SECONDS', '30')),
+        proxy_headers=True
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# singleflight.py - Coalescing of identical in-flight generations
+import asyncio
+import os
+import secrets
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from cache import connect_shared
+
+
+class SQLiteLeases:
+    """Cross-process generation leases, so one worker generates a key while the others wait"""
+
+    def __init__(self, path: str, ttl_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{os.getpid()}-{secrets.token_hex(4)}"
+        self._lock = threading.Lock()
+        self._conn = connect_shared(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def acquire(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            # A crashed worker's lease runs out instead of blocking the key forever
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + self.ttl_seconds)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def held(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM leases WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+            self._conn.commit()
+
+
+class EventFeed:
+    """Events published by one in-flight call, replayed from the start to every follower"""
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+        self._begun = asyncio.Event()
+
+    def begin(self) -> None:
+        """The call is past admission and will produce events (or wait for another worker's)"""
+        self._begun.set()
+
+    async def wait_begun(self) -> None:
+        """Wait until the call has begun or has already finished"""
+        await self._begun.wait()
+
+    def publish(self, event: Any) -> None:
+        self.events.append(event)
+        self._wake()
+
+    def close(self) -> None:
+        self.closed = True
+        self._begun.set()
+        self._wake()
+
+    def _wake(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self) -> AsyncIterator[Any]:
+        """Every event so far, then each new one until the feed closes"""
+        index = 0
+        while True:
+            # Taken before draining, so a publish during a yield is not missed
+            changed = self._changed
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.closed:
+                return
+            await changed.wait()
+
+
+class SingleFlight:
+    """
+    Run at most one coroutine per key; concurrent callers share its outcome.
+    With leases, workers in other processes wait for the generating worker's
+    result to show up through `lookup` instead of generating it again. A call
+    started with a feed lets concurrent callers follow its progress too.
+    """
+
+    def __init__(self, leases: Optional[SQLiteLeases] = None, poll_interval: float = 0.1):
+        self.leases = leases
+        self.poll_interval = poll_interval
+        self.calls = 0
+        self.coalesced = 0
+        self.shared = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._feeds: Dict[str, EventFeed] = {}
+
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]],
+              lookup: Optional[Callable[[], Any]] = None, feed: Optional[EventFeed] = None) -> asyncio.Task:
+        """The in-flight task for key, starting fn (publishing to feed) if there is none"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            if self.leases is not None and lookup is not None:
+                task = asyncio.ensure_future(self._leased(key, fn, lookup, feed))
+            else:
+                task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            if feed is not None:
+                self._feeds[key] = feed
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return task
+
+    def running(self, key: str) -> bool:
+        return key in self._inflight
+
+    def feed(self, key: str) -> Optional[EventFeed]:
+        """The feed of the in-flight call for key, if it was started with one"""
+        return self._feeds.get(key)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 lookup: Optional[Callable[[], Any]] = None) -> Any:
+        # Shield so one caller disconnecting does not cancel the shared work
+        return await asyncio.shield(self.start(key, fn, lookup))
+
+    async def _leased(self, key: str, fn: Callable[[], Awaitable[Any]], lookup: Callable[[], Any],
+                      feed: Optional[EventFeed] = None) -> Any:
+        # Lease and lookup calls wait on SQLite, so they run in threads, not on the event loop
+        while not await asyncio.to_thread(self.leases.acquire, key):
+            if feed is not None:
+                # Waiting on another worker's generation needs no admission here
+                feed.begin()
+            # Another worker is generating this key; wait for its result
+            while await asyncio.to_thread(self.leases.held, key):
+                await asyncio.sleep(self.poll_interval)
+                result = await asyncio.to_thread(lookup)
+                if result is not None:
+                    self.shared += 1
+                    return result
+            # Released without a stored result (e.g. a fallback); try to take over
+            result = await asyncio.to_thread(lookup)
+            if result is not None:
+                self.shared += 1
+                return result
+        try:
+            # The previous holder may have stored the result just before releasing
+            result = await asyncio.to_thread(lookup)
+            if result is not None:
+                self.shared += 1
+                return result
+            return await fn()
+        finally:
+            await asyncio.to_thread(self.leases.release, key)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            feed = self._feeds.pop(key, None)
+            if feed is not None:
+                feed.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "shared_across_workers": self.shared,
+            "in_flight": len(self._inflight)
+        }
@@ -0,0 +1,101 @@
+# startup_bench.py - Cold start of the API: import time and time to first success
+#
+# Each run starts a fresh process. Import time is measured for `import main`
+# alone; a separate uvicorn server is then timed from spawn until /livez,
+# /readyz and a first POST /generate-technique answer 200. Pass --root to
+# measure another checkout of the app, e.g. to compare two revisions.
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from questions import answers_for_index
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def import_seconds(root: str, env: dict) -> float:
+    output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=root, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(check, started: float, timeout: float) -> float:
+    """Seconds since started at which check() first returned True"""
+    while time.perf_counter() - started < timeout:
+        try:
+            if check():
+                return time.perf_counter() - started
+        except requests.RequestException:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError("Server did not become ready in time")
+
+
+def server_run(root: str, env: dict, timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    assessment = {"answers": answers_for_index(0)}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        # /livez and /readyz only exist in newer revisions; /health stands in for both
+        live = wait_for(lambda: requests.get(f"{base}/livez", timeout=1).status_code == 200
+                        or requests.get(f"{base}/health", timeout=1).status_code == 200, started, timeout)
+        ready = wait_for(lambda: requests.get(f"{base}/readyz", timeout=1).status_code in (200, 404), started, timeout)
+        first = wait_for(lambda: requests.post(f"{base}/generate-technique", json=assessment,
+                                               timeout=30).status_code == 200, started, timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"live": live, "ready": ready, "first_success": first}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time and time to first successful request")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--root', default=ROOT, help="directory containing main.py")
+    parser.add_argument('--backend', default='stub', help="MODEL_BACKEND for the runs")
+    parser.add_argument('--stub-latency', default='fixed:0', help="STUB_LATENCY for the stub backend")
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    env = dict(os.environ, MODEL_BACKEND=args.backend, STUB_LATENCY=args.stub_latency,
+               CACHE_BACKEND='none', PRECOMPUTED_PATH='startup-bench-missing.json.gz')
+    env.setdefault('GEMINI_API_KEY', 'benchmark')
+    imports = [import_seconds(args.root, env) for _ in range(args.runs)]
+    runs = [server_run(args.root, env, args.timeout) for _ in range(args.runs)]
+
+    def median_ms(values) -> float:
+        return round(statistics.median(values) * 1000, 1)
+
+    report = {
+        "backend": args.backend,
+        "runs": args.runs,
+        "import_ms": median_ms(imports),
+        "live_ms": median_ms([run["live"] for run in runs]),
+        "ready_ms": median_ms([run["ready"] for run in runs]),
+        "first_success_ms": median_ms([run["first_success"] for run in runs])
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
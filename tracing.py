@@ -0,0 +1,105 @@
+# tracing.py - Opt-in per-request trace spans and Server-Timing headers
+#
+# With TRACING_ENABLED=1 every request gets a trace. Each generation stage
+# becomes a span, summarized in the response's Server-Timing header and,
+# when TRACE_FILE is set, appended to that file as one OTLP-style JSON span
+# record per line.
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from metrics import STAGE_SECONDS
+
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', '0').lower() in ('1', 'true', 'yes')
+
+
+class SpanFileExporter:
+    """Append finished spans to a local file as JSON lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(',', ':'))
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class Trace:
+    """The spans recorded while handling one request"""
+
+    def __init__(self, exporter: Optional[SpanFileExporter] = None):
+        self.trace_id = secrets.token_hex(16)
+        self.exporter = exporter
+        self.spans: List[Dict[str, Any]] = []
+        self._stack: List[str] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        span_id = secrets.token_hex(8)
+        parent_id = self._stack[-1] if self._stack else None
+        self._stack.append(span_id)
+        start_ns = time.time_ns()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if self._stack and self._stack[-1] == span_id:
+                self._stack.pop()
+            record = {
+                "traceId": self.trace_id,
+                "spanId": span_id,
+                "parentSpanId": parent_id,
+                "name": name,
+                "startTimeUnixNano": start_ns,
+                "endTimeUnixNano": start_ns + int(duration_ms * 1e6),
+                "attributes": [{"key": key, "value": {"stringValue": str(value)}}
+                               for key, value in attributes.items()]
+            }
+            self.spans.append({"name": name, "duration_ms": duration_ms, "root": parent_id is None})
+            if self.exporter is not None:
+                self.exporter.export(record)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, summing repeated stages"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            name = 'total' if span["root"] else span["name"]
+            totals[name] = totals.get(name, 0.0) + span["duration_ms"]
+        return ', '.join(f"{name};dur={duration:.1f}" for name, duration in totals.items())
+
+
+_exporter = SpanFileExporter(os.environ['TRACE_FILE']) if os.getenv('TRACE_FILE') else None
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """Open a request trace whose root span covers the whole block"""
+    trace = Trace(_exporter)
+    token = _current_trace.set(trace)
+    try:
+        with trace.span(name, **attributes):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a generation stage in the latency histogram and, if tracing, as a span"""
+    trace = _current_trace.get()
+    with STAGE_SECONDS.labels(name).time():
+        if trace is None:
+            yield
+        else:
+            with trace.span(name):
+                yield